@@ -0,0 +1,71 @@
+"""
+Caché en disco para respuestas de descargas (p. ej. Yahoo Finance).
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+
+class FileCache:
+    """Caché de DataFrames en disco con expiración (TTL) opcional."""
+
+    def __init__(self, cache_dir, ttl_seconds=None):
+        """
+        Args:
+            cache_dir: directorio donde se guardan las entradas
+            ttl_seconds: segundos de validez de cada entrada (None = sin expiración)
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    def _paths(self, key):
+        """Devuelve las rutas (datos, metadatos) asociadas a una clave."""
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return f"{base}.pkl", f"{base}.json"
+
+    def get(self, key):
+        """
+        Recupera una entrada de la caché.
+
+        Returns:
+            pd.DataFrame o None si no existe, expiró o está corrupta
+        """
+        data_path, meta_path = self._paths(key)
+
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('key') != key:
+            return None
+
+        if self.ttl_seconds is not None:
+            age = time.time() - meta.get('created_at', 0)
+            if age > self.ttl_seconds:
+                return None
+
+        try:
+            return pd.read_pickle(data_path)
+        except Exception:
+            return None
+
+    def set(self, key, df):
+        """Guarda un DataFrame en la caché junto con su marca de tiempo."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+
+        df.to_pickle(data_path)
+        with open(meta_path, 'w') as f:
+            json.dump({'key': key, 'created_at': time.time()}, f)
+
+
+def download_cache_key(ticker, start, end, interval):
+    """Construye la clave de caché de una descarga de precios."""
+    return f"{ticker}|{start}|{end}|{interval}"
@@ -0,0 +1,91 @@
+"""
+Carga de la configuración del proyecto con caché en memoria y en disco.
+"""
+
+import copy
+import json
+import os
+from functools import lru_cache
+
+import yaml
+
+try:
+    # Cargador en C (libyaml), mucho más rápido que el de Python puro
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+def _sidecar_path(config_path):
+    """Ruta del JSON con la configuración ya parseada."""
+    return f"{config_path}.cache.json"
+
+
+def _read_sidecar(config_path, mtime_ns, size):
+    """
+    Lee la configuración desde el JSON auxiliar si corresponde al YAML actual.
+
+    Returns:
+        dict o None si no existe, está corrupto o es de otra versión del YAML
+    """
+    try:
+        with open(_sidecar_path(config_path), 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if sidecar.get('mtime_ns') != mtime_ns or sidecar.get('size') != size:
+        return None
+    return sidecar.get('config')
+
+
+def _write_sidecar(config_path, mtime_ns, size, config):
+    """Guarda la configuración parseada en JSON (se ignora cualquier error)."""
+    sidecar_path = _sidecar_path(config_path)
+    tmp_path = f"{sidecar_path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'mtime_ns': mtime_ns, 'size': size, 'config': config}, f)
+        os.replace(tmp_path, sidecar_path)
+    except (OSError, TypeError, ValueError):
+        # Directorio de solo lectura o valores no representables en JSON
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=100)
+def _load_config_cached(config_path, mtime_ns, size):
+    """Parsea el YAML una sola vez por ruta, fecha de modificación y tamaño."""
+    config = _read_sidecar(config_path, mtime_ns, size)
+    if config is not None:
+        return config
+
+    with open(config_path, 'r') as f:
+        config = yaml.load(f, Loader=_Loader)
+
+    _write_sidecar(config_path, mtime_ns, size, config)
+    return config
+
+
+def load_config(config_path="config/settings.yaml"):
+    """
+    Carga la configuración desde el archivo YAML.
+
+    El resultado se cachea por ruta absoluta, fecha de modificación y tamaño,
+    de modo que una edición del archivo invalida la caché automáticamente
+    (el tamaño cubre ediciones dentro de la resolución del reloj del sistema).
+    Entre procesos se reutiliza un JSON auxiliar (<config>.cache.json), que
+    se lee mucho más rápido que el YAML.
+
+    Args:
+        config_path: Ruta al archivo de configuración
+
+    Returns:
+        dict: copia de la configuración (puede modificarse sin afectar la caché)
+    """
+    config_path = os.path.abspath(config_path)
+    stat = os.stat(config_path)
+    config = _load_config_cached(config_path, stat.st_mtime_ns, stat.st_size)
+    return copy.deepcopy(config)
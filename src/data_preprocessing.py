@@ -2,73 +2,392 @@
 Módulo para descarga y procesamiento de datos financieros.
 """
 
-import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import math
+import time
+from dataclasses import dataclass
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import yaml
 from pathlib import Path
+try:
+    from .cache import FileCache, download_cache_key
+    from .config_loader import load_config
+    from .jit import njit, prange, NUMBA_AVAILABLE
+    from .storage import write_table, write_columnar_copy, read_table, table_exists
+except ImportError:
+    from cache import FileCache, download_cache_key
+    from config_loader import load_config
+    from jit import njit, prange, NUMBA_AVAILABLE
+    from storage import write_table, write_columnar_copy, read_table, table_exists
 
 
-def load_config(config_path="config/settings.yaml"):
-    """Carga la configuración desde el archivo YAML."""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+MANIFEST_NAME = '.manifest.json'
 
+# A partir de este número de activos compensa compilar el kernel de Numba
+NUMBA_MIN_ASSETS = 64
 
-def download_data(config):
+
+def local_dates(df):
+    """
+    Quita la zona horaria del índice conservando la hora local del mercado.
+
+    yf.download devuelve fechas sin zona horaria y Ticker.history con la
+    zona del mercado; ambas rutas (y la caché) deben coincidir para poder
+    alinear los activos en calculate_returns_frame.
+
+    Args:
+        df: DataFrame de precios indexado por fecha
+
+    Returns:
+        pd.DataFrame: el mismo DataFrame si ya no tenía zona horaria
+    """
+    if getattr(df.index, 'tz', None) is None:
+        return df
+    return df.tz_localize(None)
+
+
+def download_batch(tickers, data_source):
+    """
+    Descarga todos los tickers en una sola llamada a Yahoo Finance.
+
+    Args:
+        tickers: lista de tickers a descargar
+        data_source: sección 'data_source' de la configuración
+
+    Returns:
+        dict: DataFrame de precios por ticker (solo los que trajeron datos)
+    """
+    try:
+        data = yf.download(
+            tickers=" ".join(tickers),
+            start=data_source['start_date'],
+            end=data_source['end_date'],
+            interval=data_source['interval'],
+            group_by='ticker',
+            auto_adjust=True,
+            actions=True,
+            threads=True,
+            ignore_tz=True,
+            progress=False
+        )
+    except Exception as e:
+        print(f"  ⚠️  Error en la descarga en lote: {str(e)}")
+        return {}
+
+    if data is None or data.empty:
+        return {}
+
+    frames = {}
+
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                df = data[ticker].dropna(how='all')
+                if not df.empty:
+                    frames[ticker] = df
+    elif len(tickers) == 1:
+        # Con un único ticker yfinance puede devolver columnas planas
+        frames[tickers[0]] = data.dropna(how='all')
+
+    return frames
+
+
+def download_ticker(ticker, data_source):
+    """
+    Descarga un único ticker con Ticker.history (ruta de respaldo).
+
+    Returns:
+        pd.DataFrame: precios del ticker (vacío si no hay datos), con fechas
+            sin zona horaria como en download_batch
+    """
+    ticker_obj = yf.Ticker(ticker)
+    return local_dates(ticker_obj.history(
+        start=data_source['start_date'],
+        end=data_source['end_date'],
+        interval=data_source['interval']
+    ))
+
+
+def download_tickers_parallel(tickers, data_source, max_workers=8):
+    """
+    Descarga varios tickers de forma individual y concurrente.
+
+    yfinance libera el GIL durante las peticiones HTTP, así que los hilos
+    solapan la espera de red de cada ticker.
+
+    Args:
+        tickers: lista de tickers a descargar
+        data_source: sección 'data_source' de la configuración
+        max_workers: número máximo de hilos
+
+    Returns:
+        tuple: (dict ticker -> DataFrame, dict ticker -> excepción); las
+            fechas vienen sin zona horaria (download_ticker), igual que en
+            download_batch, para poder combinarlas con frames.update
+    """
+    frames = {}
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as executor:
+        futures = {
+            executor.submit(download_ticker, ticker, data_source): ticker
+            for ticker in tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                frames[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = e
+
+    return frames, errors
+
+
+def get_download_cache(data_source, use_cache=True):
+    """
+    Crea la caché de descargas según la sección 'data_source' de la configuración.
+
+    Returns:
+        FileCache o None si la caché está deshabilitada
+    """
+    cache_config = data_source.get('cache', {})
+    if not use_cache or not cache_config.get('enabled', False):
+        return None
+
+    ttl_hours = cache_config.get('ttl_hours')
+    ttl_seconds = ttl_hours * 3600 if ttl_hours is not None else None
+    return FileCache(cache_config.get('path', '.cache/yf/'), ttl_seconds=ttl_seconds)
+
+
+def download_data(config, use_cache=True):
     """
     Descarga datos históricos de Yahoo Finance.
-    
+
+    Todos los tickers se piden en un único yf.download; solo los que
+    vuelven vacíos se reintentan de forma individual. Si la caché está
+    habilitada, los tickers ya descargados con los mismos parámetros
+    (inicio, fin, intervalo) se leen desde disco.
+
     Args:
         config: Diccionario con la configuración del proyecto
-        
+        use_cache: si se permite usar la caché de descargas
+
     Returns:
         dict: Diccionario con DataFrames de precios por activo
     """
     assets = config['assets']
     data_source = config['data_source']
-    
+    storage_format = data_source.get('storage_format', 'csv')
+
     # Crear directorio si no existe
-    os.makedirs(data_source['download_path'], exist_ok=True)
-    
+    download_dir = Path(data_source['download_path'])
+    download_dir.mkdir(parents=True, exist_ok=True)
+
+    ticker_to_asset = {
+        asset_info['ticker']: asset_type
+        for asset_type, asset_info in assets.items()
+    }
+
+    cache = get_download_cache(data_source, use_cache)
+    cache_keys = {
+        ticker: download_cache_key(
+            ticker,
+            data_source['start_date'],
+            data_source['end_date'],
+            data_source['interval']
+        )
+        for ticker in ticker_to_asset
+    }
+
+    frames = {}
+    if cache is not None:
+        for ticker, key in cache_keys.items():
+            cached = cache.get(key)
+            if cached is not None:
+                # Entradas de versiones anteriores pueden tener zona horaria
+                frames[ticker] = local_dates(cached)
+        if frames:
+            print(f"  💾 {len(frames)} activos leídos desde la caché")
+
+    tickers = [ticker for ticker in ticker_to_asset if ticker not in frames]
+    if tickers:
+        print(f"Descargando {len(tickers)} activos en lote ({', '.join(tickers)})...")
+        downloaded = download_batch(tickers, data_source)
+        frames.update(downloaded)
+        if cache is not None:
+            for ticker, df in downloaded.items():
+                cache.set(cache_keys[ticker], df)
+
+    # Los tickers que no llegaron en el lote se reintentan en paralelo
+    missing = [
+        ticker for ticker in ticker_to_asset
+        if frames.get(ticker) is None or frames[ticker].empty
+    ]
+    errors = {}
+    if missing:
+        for ticker in missing:
+            name = assets[ticker_to_asset[ticker]]['name']
+            print(f"  🔁 Reintentando {name} ({ticker}) de forma individual...")
+
+        retried, errors = download_tickers_parallel(missing, data_source)
+        frames.update(retried)
+        if cache is not None:
+            for ticker, df in retried.items():
+                if not df.empty:
+                    cache.set(cache_keys[ticker], df)
+
     prices = {}
-    
-    for asset_type, asset_info in assets.items():
-        ticker = asset_info['ticker']
-        name = asset_info['name']
-        
-        print(f"Descargando {name} ({ticker})...")
-        
+
+    for ticker, asset_type in ticker_to_asset.items():
+        name = assets[asset_type]['name']
+
+        if ticker in errors:
+            print(f"  ❌ Error descargando {ticker}: {str(errors[ticker])}")
+            continue
+
+        df = frames.get(ticker)
+
         try:
-            # Descargar datos
-            ticker_obj = yf.Ticker(ticker)
-            df = ticker_obj.history(
-                start=data_source['start_date'],
-                end=data_source['end_date'],
-                interval=data_source['interval']
-            )
-            
-            if df.empty:
+            if df is None or df.empty:
                 print(f"  ⚠️  No se obtuvieron datos para {ticker}")
                 continue
-            
+
             # Guardar datos crudos
-            filename = f"{asset_type}_{ticker.replace('^', '').replace('=', '_')}.csv"
-            filepath = os.path.join(data_source['download_path'], filename)
-            df.to_csv(filepath)
-            
+            filepath = raw_data_path(download_dir, asset_type, ticker)
+            # La fecha pasa a ser columna: to_csv es mucho más rápido sin índice
+            write_table(df.reset_index(), filepath, storage_format, index=False)
+
             prices[asset_type] = df['Close']
-            print(f"  ✅ Datos descargados: {len(df)} registros")
-            
+            print(f"  ✅ {name} ({ticker}): {len(df)} registros")
+
         except Exception as e:
             print(f"  ❌ Error descargando {ticker}: {str(e)}")
             continue
-    
+
     return prices
 
 
+def calculate_returns_frame(prices_dict):
+    """
+    Calcula retornos logarítmicos alineados en un único DataFrame.
+
+    Args:
+        prices_dict: Diccionario con Series de precios por activo
+
+    Returns:
+        pd.DataFrame: retornos por fecha (filas) y activo (columnas); NaN
+        donde un activo no cotizó ese día
+    """
+    # Alinear todas las series en un único DataFrame
+    prices_df = pd.concat(prices_dict, axis=1, sort=True)
+    prices = prices_df.to_numpy(dtype=float)
+
+    if NUMBA_AVAILABLE and prices.shape[1] >= NUMBA_MIN_ASSETS:
+        # Universos grandes: kernel compilado, en paralelo por columnas
+        log_returns = pd.DataFrame(
+            _log_returns_kernel(np.asfortranarray(prices)),
+            index=prices_df.index,
+            columns=prices_df.columns
+        )
+    else:
+        log_prices = pd.DataFrame(
+            np.log(prices),
+            index=prices_df.index,
+            columns=prices_df.columns
+        )
+
+        # ffill + diff reproduce el retorno respecto a la observación válida anterior
+        # de cada activo, aunque los calendarios de negociación no coincidan
+        log_returns = log_prices.ffill().diff().where(log_prices.notna())
+
+    return log_returns.dropna(how='all')
+
+
+@njit(parallel=True, cache=True)
+def _log_returns_kernel(prices):
+    """
+    Retornos logarítmicos por columna respecto a la observación válida anterior.
+
+    Mismo resultado que log(prices).ffill().diff() enmascarado con los NaN
+    originales: NaN en la primera observación y donde no hay precio.
+    """
+    n_rows, n_cols = prices.shape
+    out = np.empty((n_rows, n_cols))
+
+    for j in prange(n_cols):
+        prev = np.nan
+        for i in range(n_rows):
+            price = prices[i, j]
+            if math.isnan(price):
+                out[i, j] = np.nan
+                continue
+            cur = math.log(price)
+            out[i, j] = cur - prev
+            prev = cur
+
+    return out
+
+
+@dataclass
+class Returns:
+    """
+    Retornos de varios activos en un único bloque contiguo (fechas x activos).
+
+    Los huecos de calendario se representan como NaN. Para compatibilidad con
+    el formato anterior (dict de Series), returns['stocks'] devuelve la Series
+    del activo sin NaN, y también admite 'in', iteración, keys() e items().
+
+    Attributes:
+        values: np.ndarray de forma (T, N) con los retornos logarítmicos
+        dates: pd.DatetimeIndex de longitud T
+        columns: lista con los N nombres de activo
+    """
+    values: np.ndarray
+    dates: pd.Index
+    columns: list
+
+    @classmethod
+    def from_frame(cls, df):
+        """Construye el objeto desde un DataFrame con un activo por columna."""
+        return cls(
+            values=np.ascontiguousarray(df.to_numpy(dtype=np.float64)),
+            dates=df.index,
+            columns=list(df.columns)
+        )
+
+    def to_dataframe(self):
+        """DataFrame alineado (sin copiar los valores)."""
+        return pd.DataFrame(self.values, index=self.dates, columns=self.columns, copy=False)
+
+    def to_dict_of_series(self):
+        """Formato anterior: dict de Series por activo, sin NaN."""
+        return {asset_type: self[asset_type] for asset_type in self.columns}
+
+    def __getitem__(self, asset_type):
+        column = self.values[:, self.columns.index(asset_type)]
+        mask = ~np.isnan(column)
+        return pd.Series(column[mask], index=self.dates[mask], name=asset_type)
+
+    def __contains__(self, asset_type):
+        return asset_type in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def keys(self):
+        return list(self.columns)
+
+    def items(self):
+        return self.to_dict_of_series().items()
+
+
 def calculate_returns(prices_dict):
     """
     Calcula retornos logarítmicos desde precios.
@@ -77,16 +396,12 @@ def calculate_returns(prices_dict):
         prices_dict: Diccionario con Series de precios por activo
         
     Returns:
-        dict: Diccionario con Series de retornos por activo
+        Returns: retornos por activo (accesibles como returns['stocks'])
     """
-    returns = {}
-    
-    for asset_type, prices in prices_dict.items():
-        # Calcular retornos logarítmicos
-        log_returns = np.log(prices / prices.shift(1)).dropna()
-        returns[asset_type] = log_returns
-    
-    return returns
+    if not prices_dict:
+        return Returns(np.empty((0, 0)), pd.DatetimeIndex([]), [])
+
+    return Returns.from_frame(calculate_returns_frame(prices_dict))
 
 
 def consolidate_returns(returns_df):
@@ -100,21 +415,30 @@ def consolidate_returns(returns_df):
     Returns:
         pd.DataFrame: DataFrame consolidado con una fila por fecha
     """
-    # Asegurar que el índice es DatetimeIndex
-    if not isinstance(returns_df.index, pd.DatetimeIndex):
-        returns_df.index = pd.to_datetime(returns_df.index)
-    
     # Agrupar por fecha (solo la fecha, sin hora)
-    # Para cada columna, tomar el primer valor no-NaN
-    consolidated = returns_df.groupby(returns_df.index.date).agg({
-        col: lambda x: x.dropna().iloc[0] if len(x.dropna()) > 0 else np.nan
-        for col in returns_df.columns
-    })
-    
-    # Convertir el índice de vuelta a DatetimeIndex
-    consolidated.index = pd.to_datetime(consolidated.index)
-    
-    return consolidated
+    # first() omite NaN, así que toma el primer valor no-NaN de cada columna
+    dates = normalize_dates(returns_df.index)
+    return returns_df.set_axis(dates).groupby(level=0).first()
+
+
+def normalize_dates(index):
+    """
+    Convierte un índice de fechas a días naturales sin hora ni zona horaria.
+
+    Args:
+        index: índice con marcas de tiempo
+
+    Returns:
+        pd.DatetimeIndex: índice normalizado a medianoche
+    """
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.to_datetime(index)
+
+    dates = index.normalize()
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    # Como con la agrupación por .date, el índice resultante no lleva nombre
+    return dates.rename(None)
 
 
 def calculate_statistics(returns_dict):
@@ -122,41 +446,150 @@ def calculate_statistics(returns_dict):
     Calcula estadísticas anualizadas (media y desviación estándar).
     
     Args:
-        returns_dict: Diccionario con Series de retornos por activo
+        returns_dict: Returns, diccionario con Series de retornos por activo
+            o DataFrame con un activo por columna
         
     Returns:
         pd.DataFrame: DataFrame con estadísticas anualizadas
     """
-    stats_list = []
-    
-    for asset_type, returns in returns_dict.items():
-        # Calcular estadísticas diarias
-        mean_daily = returns.mean()
-        std_daily = returns.std()
-        
-        # Anualizar (252 días de trading)
-        trading_days = 252
-        mean_annual = mean_daily * trading_days
-        std_annual = std_daily * np.sqrt(trading_days)
-        
-        stats_list.append({
-            'asset': asset_type,
-            'mean_return_annual': mean_annual,
-            'std_dev_annual': std_annual,
-            'sharpe_ratio': mean_annual / std_annual if std_annual > 0 else 0,
-            'observations': len(returns)
-        })
-    
-    stats_df = pd.DataFrame(stats_list)
+    if not isinstance(returns_dict, Returns):
+        returns_dict = Returns.from_frame(pd.DataFrame(returns_dict))
+
+    # Reducciones por columna sobre la matriz contigua (fechas x activos);
+    # los huecos de calendario quedan como NaN y se excluyen con la máscara
+    values = returns_dict.values
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    filled = np.where(valid, values, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_daily = filled.sum(axis=0) / counts
+        deviations = np.where(valid, values - mean_daily, 0.0)
+        std_daily = np.sqrt((deviations ** 2).sum(axis=0) / (counts - 1))
+
+    # Anualizar (252 días de trading)
+    trading_days = 252
+    mean_annual = mean_daily * trading_days
+    std_annual = std_daily * np.sqrt(trading_days)
+
+    sharpe = np.zeros_like(mean_annual)
+    np.divide(mean_annual, std_annual, out=sharpe, where=std_annual > 0)
+
+    stats_df = pd.DataFrame({
+        'asset': returns_dict.columns,
+        'mean_return_annual': mean_annual,
+        'std_dev_annual': std_annual,
+        'sharpe_ratio': sharpe,
+        'observations': counts
+    })
     return stats_df
 
 
-def process_data(config_path="config/settings.yaml"):
+def raw_data_path(download_dir, asset_type, ticker):
+    """Ruta del archivo de datos crudos de un activo."""
+    filename = f"{asset_type}_{ticker.replace('^', '').replace('=', '_')}.csv"
+    return Path(download_dir) / filename
+
+
+def pipeline_key(config):
+    """
+    Huella de las entradas del pipeline (activos, fechas, intervalo y formato).
+
+    Returns:
+        str: hash MD5 de los parámetros que determinan los datos procesados
+    """
+    data_source = config['data_source']
+    inputs = {
+        'assets': {k: v['ticker'] for k, v in config['assets'].items()},
+        'start': data_source['start_date'],
+        'end': data_source['end_date'],
+        'interval': data_source['interval'],
+        'storage_format': data_source.get('storage_format', 'csv')
+    }
+    return hashlib.md5(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_processed_data(config):
+    """
+    Carga los resultados de una ejecución previa si siguen vigentes.
+
+    Son vigentes cuando el manifiesto del directorio procesado coincide con
+    las entradas actuales y existen todos los archivos generados.
+
+    Returns:
+        tuple (prices, returns, stats) o None si hay que reprocesar
+    """
+    data_source = config['data_source']
+    processed_dir = Path(data_source['processed_path'])
+    download_dir = Path(data_source['download_path'])
+    storage_format = data_source.get('storage_format', 'csv')
+
+    try:
+        with open(processed_dir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Manifiestos sin zonas horarias son de versiones anteriores: se reprocesa
+    if manifest.get('key') != pipeline_key(config) or 'timezones' not in manifest:
+        return None
+
+    raw_paths = {
+        asset_type: raw_data_path(download_dir, asset_type, ticker)
+        for asset_type, ticker in manifest.get('assets', {}).items()
+    }
+    outputs = [processed_dir / 'returns.csv', processed_dir / 'asset_statistics.csv']
+    if not all(table_exists(path) for path in list(raw_paths.values()) + outputs):
+        return None
+
+    # Las fechas se leen en UTC y se devuelven a la zona horaria original,
+    # igual que las entrega download_data
+    prices = {}
+    for asset_type, path in raw_paths.items():
+        raw = read_table(path, storage_format)
+        dates = pd.DatetimeIndex(pd.to_datetime(raw['Date'], utc=True), name='Date')
+        prices[asset_type] = pd.Series(
+            raw['Close'].to_numpy(),
+            index=dates.tz_convert(manifest['timezones'].get(asset_type)),
+            name='Close'
+        )
+
+    returns_df = read_table(processed_dir / 'returns.csv', storage_format, index_col=0)
+    returns_df.index = pd.to_datetime(returns_df.index)
+    returns = Returns.from_frame(returns_df)
+
+    stats = read_table(processed_dir / 'asset_statistics.csv', storage_format)
+
+    return prices, returns, stats
+
+
+def write_manifest(config, prices):
+    """Registra las entradas de la ejecución actual en el directorio procesado."""
+    processed_dir = Path(config['data_source']['processed_path'])
+    manifest = {
+        'key': pipeline_key(config),
+        'assets': {
+            asset_type: config['assets'][asset_type]['ticker']
+            for asset_type in prices
+        },
+        'timezones': {
+            asset_type: str(series.index.tz) if series.index.tz is not None else None
+            for asset_type, series in prices.items()
+        },
+        'wrote_at': time.time()
+    }
+    with open(processed_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def process_data(config_path="config/settings.yaml", use_cache=True, force=False):
     """
     Función principal que ejecuta todo el pipeline de procesamiento.
     
     Args:
         config_path: Ruta al archivo de configuración
+        use_cache: si se permite usar la caché de descargas
+        force: reprocesa aunque las entradas no hayan cambiado
     """
     # Cargar configuración
     config = load_config(config_path)
@@ -165,9 +598,16 @@ def process_data(config_path="config/settings.yaml"):
     print("📊 PROCESAMIENTO DE DATOS FINANCIEROS")
     print("=" * 60)
     
+    if not force:
+        previous = load_processed_data(config)
+        if previous is not None:
+            print("\n✅ Datos procesados al día (entradas sin cambios), se reutilizan.")
+            print("   Usa force=True (o --force) para reprocesar.")
+            return previous
+    
     # Descargar datos
     print("\n1. Descargando datos históricos...")
-    prices = download_data(config)
+    prices = download_data(config, use_cache=use_cache)
     
     if not prices:
         print("❌ No se pudieron descargar datos. Abortando.")
@@ -176,24 +616,32 @@ def process_data(config_path="config/settings.yaml"):
     # Calcular retornos
     print("\n2. Calculando retornos...")
     returns = calculate_returns(prices)
+    returns_df = returns.to_dataframe()
     
     # Guardar retornos procesados
-    os.makedirs(config['data_source']['processed_path'], exist_ok=True)
-    returns_df = pd.DataFrame(returns)
+    processed_dir = Path(config['data_source']['processed_path'])
+    processed_dir.mkdir(parents=True, exist_ok=True)
     
     # Consolidar retornos por fecha (eliminar duplicados y NaN innecesarios)
-    print("  Consolidando retornos por fecha...")
-    returns_df_consolidated = consolidate_returns(returns_df)
+    dates = normalize_dates(returns_df.index)
+    returns_df = returns_df.set_axis(dates)
+    if dates.is_unique:
+        # Ya hay una fila por fecha: basta con normalizar el índice
+        print("  Índice con una fila por fecha, se omite la consolidación")
+        returns_df_consolidated = returns_df
+    else:
+        print("  Consolidando retornos por fecha...")
+        returns_df_consolidated = returns_df.groupby(level=0).first()
     
-    returns_path = os.path.join(
-        config['data_source']['processed_path'], 
-        'returns.csv'
+    storage_format = config['data_source'].get('storage_format', 'csv')
+    returns_path = write_table(
+        returns_df_consolidated, processed_dir / 'returns.csv', storage_format
     )
-    returns_df_consolidated.to_csv(returns_path)
     
     # Verificar calidad de datos
-    total_nan = returns_df_consolidated.isna().sum().sum()
-    total_values = returns_df_consolidated.size
+    consolidated_values = returns_df_consolidated.to_numpy()
+    total_nan = int(np.isnan(consolidated_values).sum())
+    total_values = consolidated_values.size
     nan_percentage = (total_nan / total_values * 100) if total_values > 0 else 0
     
     print(f"  ✅ Retornos guardados en {returns_path}")
@@ -208,12 +656,14 @@ def process_data(config_path="config/settings.yaml"):
     stats = calculate_statistics(returns)
     
     # Guardar estadísticas
-    stats_path = os.path.join(
-        config['data_source']['processed_path'],
-        'asset_statistics.csv'
+    stats_path = write_table(
+        stats, processed_dir / 'asset_statistics.csv', storage_format, index=False
     )
-    stats.to_csv(stats_path, index=False)
     print(f"  ✅ Estadísticas guardadas en {stats_path}")
+    if stats_path.endswith('.csv'):
+        # Copia Feather para lecturas rápidas (los notebooks siguen usando el CSV)
+        write_columnar_copy(stats, stats_path)
+    write_manifest(config, prices)
     print("\n" + "=" * 60)
     print("📈 ESTADÍSTICAS ANUALIZADAS")
     print("=" * 60)
@@ -224,6 +674,15 @@ def process_data(config_path="config/settings.yaml"):
 
 
 if __name__ == "__main__":
-    process_data()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Descarga y procesa los datos financieros.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignora la caché de descargas y consulta Yahoo Finance")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocesa aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    process_data(use_cache=not args.no_cache, force=args.force)
 
 
@@ -0,0 +1,24 @@
+"""
+Compatibilidad opcional con Numba.
+
+Si Numba está instalado, se exportan njit y prange reales; si no, njit
+devuelve la función sin compilar y prange equivale a range, de modo que
+los kernels siguen funcionando (más lentos) en Python puro.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit que no compila."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+    prange = range
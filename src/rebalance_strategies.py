@@ -2,9 +2,18 @@
 Módulo para implementar estrategias de rebalanceo de cartera.
 """
 
+import inspect
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from collections import namedtuple
+
+
+# Funciones de rebalanceo para una trayectoria (ver RebalanceStrategy.step_functions)
+RebalanceFunctions = namedtuple('RebalanceFunctions', ['should_rebalance', 'rebalance'])
+
+# Estrategias disponibles por tipo de rebalanceo ('type' en la configuración),
+# rellenado con RebalanceStrategy.register
+REBALANCE_STRATEGIES = {}
 
 
 class RebalanceStrategy:
@@ -19,14 +28,76 @@ class RebalanceStrategy:
         self.target_allocation = target_allocation
         self.transaction_cost = transaction_cost
         self.last_rebalance_date = None
+        
+        # Orden fijo de activos y asignación objetivo como vector
+        self.assets = tuple(target_allocation)
+        self.target_arr = np.array(
+            [target_allocation[asset] for asset in self.assets], dtype=np.float64
+        )
+    
+    @classmethod
+    def register(cls, name):
+        """
+        Decorador que registra una estrategia en REBALANCE_STRATEGIES.
+        
+        Args:
+            name: tipo de rebalanceo ('type' en la configuración)
+            
+        Returns:
+            callable: decorador que devuelve la clase sin modificar
+        """
+        def decorator(strategy_class):
+            REBALANCE_STRATEGIES[name] = strategy_class
+            return strategy_class
+        
+        return decorator
+    
+    def allocation_array(self, current_allocation):
+        """
+        Convierte un dict de asignaciones (fracciones) en un vector ordenado
+        según self.assets.
+        
+        Args:
+            current_allocation: dict con asignaciones actuales (0 si falta un activo)
+            
+        Returns:
+            np.ndarray: asignaciones en el orden de self.assets
+        """
+        return self._ordered_array(current_allocation)
+    
+    def values_array(self, current_values):
+        """
+        Convierte un dict de valores monetarios por activo en un vector
+        ordenado según self.assets.
+        
+        Args:
+            current_values: dict con valores actuales (0 si falta un activo)
+            
+        Returns:
+            np.ndarray: valores en el orden de self.assets
+        """
+        return self._ordered_array(current_values)
+    
+    def _ordered_array(self, by_asset):
+        """Vector en el orden de self.assets a partir de un dict por activo."""
+        return np.fromiter(
+            (by_asset.get(asset, 0) for asset in self.assets),
+            dtype=np.float64,
+            count=len(self.assets)
+        )
+    
+    def reset(self):
+        """Reinicia el estado de rebalanceo al comenzar una nueva trayectoria."""
+        self.last_rebalance_date = None
     
     def should_rebalance(self, current_allocation, date, portfolio_value):
         """
         Determina si se debe rebalancear.
         
         Args:
-            current_allocation: dict con asignaciones actuales
-            date: fecha actual (datetime)
+            current_allocation: dict con asignaciones actuales, o np.ndarray
+                en el orden de self.assets
+            date: fecha actual (datetime) o índice de día entero
             portfolio_value: valor total de la cartera
             
         Returns:
@@ -34,27 +105,43 @@ class RebalanceStrategy:
         """
         raise NotImplementedError
     
-    def calculate_rebalance_cost(self, target_allocation, current_allocation, portfolio_value):
+    def calculate_rebalance_cost(self, *args):
         """
         Calcula el costo de transacción del rebalanceo.
         
-        Args:
-            target_allocation: asignaciones objetivo
-            current_allocation: asignaciones actuales
-            portfolio_value: valor total de la cartera
-            
+        Acepta dos formas de llamada:
+        
+        - ``(current_arr, portfolio_value)``: valores actuales por activo en
+          el orden de self.assets (np.ndarray, o dict con valores por activo).
+        - ``(target_allocation, current_allocation, portfolio_value)``: la
+          interfaz original, con dicts de asignaciones (fracciones).
+        
         Returns:
             float: costo de transacción
         """
-        # Calcular el cambio en cada activo
-        total_change = 0
-        for asset in target_allocation:
-            change = abs(target_allocation[asset] - current_allocation.get(asset, 0))
-            total_change += change
+        if len(args) == 3:
+            target_allocation, current_allocation, portfolio_value = args
+            return self._turnover_cost(
+                self.allocation_array(target_allocation),
+                self.allocation_array(current_allocation),
+                portfolio_value
+            )
         
-        # Costo es proporcional al cambio total
-        cost = portfolio_value * (total_change / 2) * self.transaction_cost
-        return cost
+        current_arr, portfolio_value = args
+        if isinstance(current_arr, dict):
+            current_arr = self.values_array(current_arr)
+        
+        if portfolio_value > 0:
+            current_allocation = current_arr / portfolio_value
+        else:
+            current_allocation = np.zeros_like(self.target_arr)
+        
+        return self._turnover_cost(self.target_arr, current_allocation, portfolio_value)
+    
+    def _turnover_cost(self, target_arr, current_allocation, portfolio_value):
+        """Costo proporcional a la rotación: mitad del cambio total de asignaciones."""
+        total_change = np.abs(target_arr - current_allocation).sum()
+        return float(portfolio_value * (total_change / 2) * self.transaction_cost)
     
     def rebalance(self, current_values, portfolio_value):
         """
@@ -68,35 +155,76 @@ class RebalanceStrategy:
             dict: nuevos valores después del rebalanceo
             float: costo de transacción
         """
-        # Calcular asignaciones actuales
-        current_allocation = {
-            asset: value / portfolio_value if portfolio_value > 0 else 0
-            for asset, value in current_values.items()
-        }
+        new_values, cost = self.rebalance_vec(
+            self.values_array(current_values), portfolio_value
+        )
+        return dict(zip(self.assets, new_values.tolist())), cost
+    
+    def rebalance_vec(self, current_arr, portfolio_value):
+        """
+        Rebalanceo vectorial sobre valores ordenados según self.assets.
         
-        # Calcular nuevos valores objetivo
-        new_values = {
-            asset: portfolio_value * target
-            for asset, target in self.target_allocation.items()
-        }
+        El costo es proporcional a la rotación (mitad de la suma de las
+        desviaciones absolutas) y se descuenta antes de asignar los nuevos
+        valores según target_arr.
         
-        # Calcular costo
-        cost = self.calculate_rebalance_cost(
-            self.target_allocation, 
-            current_allocation, 
-            portfolio_value
-        )
+        Args:
+            current_arr: valores actuales por activo (np.ndarray)
+            portfolio_value: valor total de la cartera
+            
+        Returns:
+            np.ndarray: nuevos valores después del rebalanceo
+            float: costo de transacción
+        """
+        cost = self.calculate_rebalance_cost(current_arr, portfolio_value)
         
-        # Aplicar costo
-        remaining_value = portfolio_value - cost
-        new_values = {
-            asset: remaining_value * target
-            for asset, target in self.target_allocation.items()
-        }
+        return (portfolio_value - cost) * self.target_arr, cost
+    
+    def step_functions(self):
+        """
+        Funciones de rebalanceo para una trayectoria, con los parámetros de la
+        estrategia ya capturados como variables locales (sin búsquedas de
+        atributos ni despacho de métodos en el bucle de simulación).
+        
+        Cada llamada devuelve funciones con estado propio (p. ej. el último
+        día rebalanceado), por lo que no se arrastra estado entre trayectorias.
+        
+        Returns:
+            RebalanceFunctions: should_rebalance(current_allocation, step_index)
+                -> bool y rebalance(current_arr, portfolio_value)
+                -> (np.ndarray, float), equivalentes a los métodos de la clase
+        """
+        target = self.target_arr
+        transaction_cost = self.transaction_cost
+        zeros = np.zeros_like(target)
         
-        return new_values, cost
+        def rebalance(current_arr, portfolio_value):
+            if portfolio_value > 0:
+                current_allocation = current_arr / portfolio_value
+            else:
+                current_allocation = zeros
+            total_change = np.abs(target - current_allocation).sum()
+            cost = float(portfolio_value * (total_change / 2) * transaction_cost)
+            return (portfolio_value - cost) * target, cost
+        
+        return RebalanceFunctions(self._step_should_rebalance(), rebalance)
+    
+    def _step_should_rebalance(self):
+        """should_rebalance(current_allocation, step_index) para step_functions."""
+        self.reset()
+        
+        def should_rebalance(current_allocation, step_index):
+            return self.should_rebalance(current_allocation, step_index, None)
+        
+        return should_rebalance
+
+
+def _period_elapsed(last_step, step_index, period_days):
+    """True si no se ha rebalanceado aún o ya pasaron period_days días."""
+    return last_step is None or step_index - last_step >= period_days
 
 
+@RebalanceStrategy.register('time')
 class TimeBasedRebalance(RebalanceStrategy):
     """Estrategia de rebalanceo basada en tiempo (mensual, trimestral, anual)."""
     
@@ -116,22 +244,66 @@ class TimeBasedRebalance(RebalanceStrategy):
             "quarterly": 90,
             "annual": 365
         }
+        
+        # Período resuelto una sola vez (en días) y último paso rebalanceado
+        self._period_days = self.frequency_days.get(frequency, 365)
+        self._last_rebalance_step = None
+    
+    def reset(self):
+        """Reinicia el estado de rebalanceo al comenzar una nueva trayectoria."""
+        super().reset()
+        self._last_rebalance_step = None
+    
+    def should_rebalance_step(self, step_index):
+        """
+        Versión entera de should_rebalance: compara índices de día en lugar
+        de restar fechas.
+        
+        Args:
+            step_index: índice de día monótono desde el inicio de la trayectoria
+            
+        Returns:
+            bool: True si se debe rebalancear
+        """
+        if _period_elapsed(self._last_rebalance_step, step_index, self._period_days):
+            self._last_rebalance_step = step_index
+            return True
+        
+        return False
+    
+    def _step_should_rebalance(self):
+        """Rebalanceo por tiempo con el período y el último día como locales."""
+        period_days = self._period_days
+        last_rebalance_step = None
+        
+        def should_rebalance(current_allocation, step_index):
+            nonlocal last_rebalance_step
+            if _period_elapsed(last_rebalance_step, step_index, period_days):
+                last_rebalance_step = step_index
+                return True
+            return False
+        
+        return should_rebalance
     
     def should_rebalance(self, current_allocation, date, portfolio_value):
         """Determina si es momento de rebalancear según la frecuencia."""
+        if isinstance(date, (int, np.integer)):
+            return self.should_rebalance_step(date)
+        
         if self.last_rebalance_date is None:
             self.last_rebalance_date = date
             return True
         
         days_since_rebalance = (date - self.last_rebalance_date).days
         
-        if days_since_rebalance >= self.frequency_days.get(self.frequency, 365):
+        if days_since_rebalance >= self._period_days:
             self.last_rebalance_date = date
             return True
         
         return False
 
 
+@RebalanceStrategy.register('threshold')
 class ThresholdBasedRebalance(RebalanceStrategy):
     """Estrategia de rebalanceo basada en umbral de desviación."""
     
@@ -147,20 +319,41 @@ class ThresholdBasedRebalance(RebalanceStrategy):
     
     def should_rebalance(self, current_allocation, date, portfolio_value):
         """Determina si alguna asignación se desvió más del umbral."""
-        for asset, target in self.target_allocation.items():
-            current = current_allocation.get(asset, 0)
-            deviation = abs(current - target)
-            
-            if deviation > self.threshold:
-                return True
+        if isinstance(current_allocation, dict):
+            current_allocation = self.allocation_array(current_allocation)
+        return self.should_rebalance_array(current_allocation)
+    
+    def _step_should_rebalance(self):
+        """Rebalanceo por umbral con objetivo y umbral como locales."""
+        target = self.target_arr
+        threshold = self.threshold
         
-        return False
+        def should_rebalance(current_allocation, step_index):
+            return bool(np.any(np.abs(current_allocation - target) > threshold))
+        
+        return should_rebalance
+    
+    def should_rebalance_array(self, current_arr):
+        """
+        Versión vectorial: una sola comparación sobre todos los activos.
+        
+        Args:
+            current_arr: asignaciones actuales en el orden de self.assets
+            
+        Returns:
+            bool: True si alguna desviación supera el umbral
+        """
+        return bool(np.any(np.abs(current_arr - self.target_arr) > self.threshold))
 
 
 def create_rebalance_strategy(portfolio_config, transaction_cost=0.002):
     """
     Factory function para crear estrategia de rebalanceo según configuración.
     
+    El tipo se busca en REBALANCE_STRATEGIES; las claves de 'rebalance' que
+    acepta el constructor (p. ej. frequency o threshold) se le pasan y el
+    resto se ignora.
+    
     Args:
         portfolio_config: dict con configuración de la cartera del YAML
         transaction_cost: costo de transacción
@@ -168,24 +361,21 @@ def create_rebalance_strategy(portfolio_config, transaction_cost=0.002):
     Returns:
         RebalanceStrategy: instancia de estrategia de rebalanceo
     """
-    target_allocation = portfolio_config['allocation']
-    rebalance_config = portfolio_config['rebalance']
-    
-    if rebalance_config['type'] == 'time':
-        frequency = rebalance_config.get('frequency', 'annual')
-        return TimeBasedRebalance(
-            target_allocation, 
-            frequency=frequency,
-            transaction_cost=transaction_cost
-        )
-    elif rebalance_config['type'] == 'threshold':
-        threshold = rebalance_config.get('threshold', 0.05)
-        return ThresholdBasedRebalance(
-            target_allocation,
-            threshold=threshold,
-            transaction_cost=transaction_cost
-        )
-    else:
-        raise ValueError(f"Tipo de rebalanceo desconocido: {rebalance_config['type']}")
-
-
+    rebalance_config = dict(portfolio_config['rebalance'])
+    rebalance_type = rebalance_config.pop('type')
+    
+    strategy_class = REBALANCE_STRATEGIES.get(rebalance_type)
+    if strategy_class is None:
+        raise ValueError(f"Tipo de rebalanceo desconocido: {rebalance_type}")
+    
+    parameters = inspect.signature(strategy_class.__init__).parameters
+    strategy_kwargs = {
+        key: value for key, value in rebalance_config.items()
+        if key in parameters and key not in ('self', 'target_allocation', 'transaction_cost')
+    }
+    
+    return strategy_class(
+        portfolio_config['allocation'],
+        transaction_cost=transaction_cost,
+        **strategy_kwargs
+    )
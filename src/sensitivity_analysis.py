@@ -5,15 +5,54 @@ Módulo para análisis de sensibilidad y comparación de escenarios.
 import pandas as pd
 import numpy as np
 import os
-import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+try:
+    from .config_loader import load_config
+    from .storage import read_table
+except ImportError:
+    from config_loader import load_config
+    from storage import read_table
 
+# Raíz del proyecto, resuelta una sola vez al importar el módulo
+_PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
-def load_config(config_path="config/settings.yaml"):
-    """Carga la configuración desde el archivo YAML."""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+# Columnas de métricas usadas por calculate_summary_statistics y sus tipos.
+# float32 basta para medias y percentiles de valores de cartera (~7 cifras
+# significativas) y reduce a la mitad la memoria recorrida en cada resumen.
+METRICS_COLUMNS = [
+    'survived_full_period', 'final_value', 'months_survived',
+    'total_withdrawals', 'total_rebalance_costs', 'total_return',
+    'total_contributions', 'net_flow'
+]
+METRICS_DTYPES = {
+    'survived_full_period': 'bool',
+    'final_value': 'float32',
+    'months_survived': 'int32',
+    'total_withdrawals': 'float32',
+    'total_rebalance_costs': 'float32',
+    'total_return': 'float32',
+    'total_contributions': 'float32',
+    'net_flow': 'float32'
+}
+
+# Percentiles del valor final incluidos en el resumen
+FINAL_VALUE_QUANTILES = [0.05, 0.25, 0.75, 0.95]
+
+
+def _project_path(path):
+    """
+    Resuelve una ruta del proyecto.
+    
+    Las rutas absolutas se devuelven tal cual. Una ruta relativa se toma del
+    directorio actual si existe allí y, si no, de la raíz del proyecto (por
+    ejemplo, al ejecutar desde notebooks/). Es una sola comprobación en disco,
+    en lugar de probar varias ubicaciones candidatas.
+    """
+    path = Path(path)
+    if path.is_absolute() or path.exists():
+        return path
+    return _PROJECT_ROOT / path
 
 
 def load_simulation_results(output_dir="results/simulations/", config_path=None):
@@ -21,65 +60,81 @@ def load_simulation_results(output_dir="results/simulations/", config_path=None)
     Carga todos los resultados de las simulaciones.
     
     Args:
-        output_dir: Directorio donde están los resultados
-        config_path: Ruta al archivo de configuración (opcional)
+        output_dir: Directorio donde están los resultados (si es relativo,
+            desde el directorio actual o, si no existe allí, desde la raíz
+            del proyecto)
+        config_path: Ruta al archivo de configuración (opcional; por defecto
+            config/settings.yaml, resuelto igual que output_dir)
     
     Returns:
         dict: Diccionario con métricas por cartera y escenario
     """
     if config_path is None:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        
-        if config_path is None:
-            config_path = "config/settings.yaml"  # Default
+        config_path = _project_path("config/settings.yaml")
     
     config = load_config(config_path)
     portfolios = config['portfolios']
     scenarios = config['economic_scenarios']
     
-    # Normalizar la ruta del directorio de resultados
-    # Si es relativa, intentar encontrar desde diferentes ubicaciones
-    if not os.path.isabs(output_dir):
-        possible_output_dirs = [
-            output_dir,  # Ruta relativa directa
-            os.path.join("..", output_dir),  # Desde notebooks/
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), output_dir)  # Desde raíz del proyecto
-        ]
-        for possible_dir in possible_output_dirs:
-            if os.path.exists(possible_dir):
-                output_dir = possible_dir
-                break
+    # Relativa: primero el directorio actual, luego la raíz del proyecto
+    output_dir = _project_path(output_dir)
     
-    results = {}
+    # Archivos a leer, en el orden de la configuración
+    tasks = [
+        (portfolio_name, scenario_name,
+         os.path.join(output_dir, f"metrics_{portfolio_name}_{scenario_name}.csv"))
+        for portfolio_name in portfolios.keys()
+        for scenario_name in scenarios.keys()
+    ]
     
-    for portfolio_name in portfolios.keys():
-        portfolio_results = {}
-        
-        for scenario_name in scenarios.keys():
-            result_key = f"{portfolio_name}_{scenario_name}"
-            metrics_path = os.path.join(output_dir, f"metrics_{result_key}.csv")
-            
-            if os.path.exists(metrics_path):
-                metrics_df = pd.read_csv(metrics_path)
-                portfolio_results[scenario_name] = metrics_df
-            else:
-                print(f"⚠️  Archivo no encontrado: {metrics_path}")
-        
-        if portfolio_results:
-            results[portfolio_name] = portfolio_results
+    # Lectura en paralelo (limitada por E/S) y solo de las columnas necesarias;
+    # los archivos ausentes se detectan al abrirlos, sin comprobarlos antes
+    frames = []
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(16, len(tasks))) as executor:
+            frames = list(executor.map(_read_metrics_if_exists, [task[2] for task in tasks]))
+    
+    results = {}
+    for (portfolio_name, scenario_name, metrics_path), metrics_df in zip(tasks, frames):
+        if metrics_df is None:
+            print(f"⚠️  Archivo no encontrado: {metrics_path}")
+            continue
+        results.setdefault(portfolio_name, {})[scenario_name] = metrics_df
     
     return results
 
 
+def _read_metrics_if_exists(metrics_path):
+    """read_metrics, o None si la tabla no existe en ningún formato."""
+    try:
+        return read_metrics(metrics_path)
+    except FileNotFoundError:
+        return None
+
+
+def read_metrics(metrics_path):
+    """
+    Lee una tabla de métricas con solo las columnas de METRICS_COLUMNS.
+    
+    Si la simulación dejó una copia columnar al día (write_columnar_copy),
+    read_table la usa en lugar de parsear el CSV. Las columnas ausentes
+    (p. ej. contribuciones en resultados antiguos) simplemente no aparecen
+    en el DataFrame.
+    
+    Args:
+        metrics_path: ruta del CSV de métricas
+        
+    Returns:
+        pd.DataFrame: métricas de todas las iteraciones
+    """
+    return read_table(
+        metrics_path,
+        usecols=lambda column: column in METRICS_COLUMNS,
+        dtype=METRICS_DTYPES,
+        engine='c'
+    )
+
+
 def calculate_summary_statistics(metrics_df):
     """
     Calcula estadísticas resumen de las métricas de simulación.
@@ -90,27 +145,47 @@ def calculate_summary_statistics(metrics_df):
     Returns:
         dict: Estadísticas resumen
     """
+    mean_columns = [
+        'survived_full_period', 'months_survived', 'total_withdrawals',
+        'total_rebalance_costs', 'total_return'
+    ]
+    # Agregar métricas de contribuciones si están disponibles
+    has_contributions = 'total_contributions' in metrics_df.columns
+    if has_contributions:
+        mean_columns += ['total_contributions', 'net_flow']
+    
+    # Una sola agregación para todas las columnas y una para los percentiles
+    aggregated = metrics_df.agg({
+        'final_value': ['mean', 'median', 'std', 'min', 'max'],
+        **dict.fromkeys(mean_columns, 'mean')
+    })
+    final_value = aggregated['final_value']
+    means = aggregated.loc['mean']
+    # np.quantile sobre el ndarray selecciona con np.partition (sin ordenar todo)
+    p5, p25, p75, p95 = np.quantile(
+        metrics_df['final_value'].to_numpy(), FINAL_VALUE_QUANTILES
+    )
+    
     stats = {
-        'survival_rate': metrics_df['survived_full_period'].mean() * 100,
-        'mean_final_value': metrics_df['final_value'].mean(),
-        'median_final_value': metrics_df['final_value'].median(),
-        'std_final_value': metrics_df['final_value'].std(),
-        'min_final_value': metrics_df['final_value'].min(),
-        'max_final_value': metrics_df['final_value'].max(),
-        'percentile_5': metrics_df['final_value'].quantile(0.05),
-        'percentile_25': metrics_df['final_value'].quantile(0.25),
-        'percentile_75': metrics_df['final_value'].quantile(0.75),
-        'percentile_95': metrics_df['final_value'].quantile(0.95),
-        'mean_months_survived': metrics_df['months_survived'].mean(),
-        'mean_total_withdrawals': metrics_df['total_withdrawals'].mean(),
-        'mean_total_rebalance_costs': metrics_df['total_rebalance_costs'].mean(),
-        'mean_total_return': metrics_df['total_return'].mean() * 100
+        'survival_rate': means['survived_full_period'] * 100,
+        'mean_final_value': final_value['mean'],
+        'median_final_value': final_value['median'],
+        'std_final_value': final_value['std'],
+        'min_final_value': final_value['min'],
+        'max_final_value': final_value['max'],
+        'percentile_5': p5,
+        'percentile_25': p25,
+        'percentile_75': p75,
+        'percentile_95': p95,
+        'mean_months_survived': means['months_survived'],
+        'mean_total_withdrawals': means['total_withdrawals'],
+        'mean_total_rebalance_costs': means['total_rebalance_costs'],
+        'mean_total_return': means['total_return'] * 100
     }
     
-    # Agregar métricas de contribuciones si están disponibles
-    if 'total_contributions' in metrics_df.columns:
-        stats['mean_total_contributions'] = metrics_df['total_contributions'].mean()
-        stats['mean_net_flow'] = metrics_df['net_flow'].mean()
+    if has_contributions:
+        stats['mean_total_contributions'] = means['total_contributions']
+        stats['mean_net_flow'] = means['net_flow']
     
     return stats
 
@@ -119,26 +194,56 @@ def compare_scenarios(results_dict):
     """
     Compara escenarios económicos para cada cartera.
     
+    Las métricas de todas las combinaciones se concatenan una sola vez y se
+    resumen con un único groupby, en lugar de un resumen por combinación.
+    
     Args:
         results_dict: Diccionario con resultados por cartera y escenario
         
     Returns:
         pd.DataFrame: Tabla comparativa
     """
-    comparison_data = []
+    frames = [
+        metrics_df.assign(portfolio=portfolio_name, scenario=scenario_name)
+        for portfolio_name, portfolio_results in results_dict.items()
+        for scenario_name, metrics_df in portfolio_results.items()
+    ]
+    if not frames:
+        return pd.DataFrame()
     
-    for portfolio_name, portfolio_results in results_dict.items():
-        for scenario_name, metrics_df in portfolio_results.items():
-            stats = calculate_summary_statistics(metrics_df)
-            
-            comparison_data.append({
-                'portfolio': portfolio_name,
-                'scenario': scenario_name,
-                **stats
-            })
+    combined = pd.concat(frames, ignore_index=True)
+    groups = combined.groupby(['portfolio', 'scenario'], sort=False)
     
-    comparison_df = pd.DataFrame(comparison_data)
-    return comparison_df
+    aggregations = {
+        'survival_rate': ('survived_full_period', 'mean'),
+        'mean_final_value': ('final_value', 'mean'),
+        'median_final_value': ('final_value', 'median'),
+        'std_final_value': ('final_value', 'std'),
+        'min_final_value': ('final_value', 'min'),
+        'max_final_value': ('final_value', 'max'),
+        'mean_months_survived': ('months_survived', 'mean'),
+        'mean_total_withdrawals': ('total_withdrawals', 'mean'),
+        'mean_total_rebalance_costs': ('total_rebalance_costs', 'mean'),
+        'mean_total_return': ('total_return', 'mean')
+    }
+    # Agregar métricas de contribuciones si están disponibles
+    if 'total_contributions' in combined.columns:
+        aggregations['mean_total_contributions'] = ('total_contributions', 'mean')
+        aggregations['mean_net_flow'] = ('net_flow', 'mean')
+    
+    comparison_df = groups.agg(**aggregations)
+    comparison_df['survival_rate'] *= 100
+    comparison_df['mean_total_return'] *= 100
+    
+    percentiles = groups['final_value'].quantile(FINAL_VALUE_QUANTILES).unstack()
+    percentiles.columns = [f"percentile_{round(q * 100)}" for q in FINAL_VALUE_QUANTILES]
+    
+    # Mismo orden de columnas que calculate_summary_statistics
+    columns = list(aggregations)
+    columns[6:6] = list(percentiles.columns)
+    comparison_df = comparison_df.join(percentiles)[columns]
+    
+    return comparison_df.reset_index()
 
 
 def compare_portfolios(results_dict, scenario='base'):
@@ -168,6 +273,29 @@ def compare_portfolios(results_dict, scenario='base'):
     return comparison_df
 
 
+def format_summary(comparison_df, columns):
+    """
+    Texto de una tabla resumen para la consola.
+    
+    Se proyectan primero las columnas pedidas y los números se muestran con
+    2 decimales, de modo que el formateador solo procesa lo que se muestra
+    (y sin la representación larga de los float32 cargados).
+    
+    Args:
+        comparison_df: DataFrame de compare_scenarios o compare_portfolios
+        columns: columnas a mostrar
+        
+    Returns:
+        str: tabla formateada sin índice
+    """
+    return comparison_df[columns].to_string(index=False, float_format=_two_decimals)
+
+
+def _two_decimals(value):
+    """Formateador de float_format con 2 decimales."""
+    return f"{value:.2f}"
+
+
 def analyze_sensitivity(config_path="config/settings.yaml"):
     """
     Función principal que ejecuta análisis de sensibilidad completo.
@@ -204,8 +332,11 @@ def analyze_sensitivity(config_path="config/settings.yaml"):
     print("\n3. Comparando carteras por escenario...")
     portfolio_comparisons = {}
     
+    # Se reutiliza la tabla de escenarios en lugar de recalcular cada resumen
     for scenario_name in config['economic_scenarios'].keys():
-        portfolio_comp = compare_portfolios(results, scenario=scenario_name)
+        portfolio_comp = scenario_comparison[
+            scenario_comparison['scenario'] == scenario_name
+        ].drop(columns='scenario').reset_index(drop=True)
         portfolio_comparisons[scenario_name] = portfolio_comp
         
         portfolio_path = os.path.join(
@@ -222,7 +353,7 @@ def analyze_sensitivity(config_path="config/settings.yaml"):
     
     summary_cols = ['portfolio', 'scenario', 'survival_rate', 'mean_final_value', 
                     'percentile_5', 'percentile_95']
-    print(scenario_comparison[summary_cols].to_string(index=False))
+    print(format_summary(scenario_comparison, summary_cols))
     
     print("\n" + "=" * 60)
     print("📈 COMPARACIÓN DE CARTERAS (Escenario Base)")
@@ -231,7 +362,7 @@ def analyze_sensitivity(config_path="config/settings.yaml"):
     if 'base' in portfolio_comparisons:
         base_cols = ['portfolio', 'survival_rate', 'mean_final_value', 
                      'percentile_5', 'percentile_95']
-        print(portfolio_comparisons['base'][base_cols].to_string(index=False))
+        print(format_summary(portfolio_comparisons['base'], base_cols))
     
     print("=" * 60)
     
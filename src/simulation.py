@@ -2,41 +2,53 @@
 Módulo para simulación Monte Carlo de carteras de inversión.
 """
 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import numpy as np
 import pandas as pd
-import yaml
 import os
-from datetime import datetime, timedelta
 from pathlib import Path
 try:
-    from .rebalance_strategies import create_rebalance_strategy
+    from .config_loader import load_config
+    from .jit import njit, prange, NUMBA_AVAILABLE
+    from .rebalance_strategies import (
+        create_rebalance_strategy, TimeBasedRebalance, ThresholdBasedRebalance
+    )
+    from .storage import read_table, table_exists, write_columnar_copy
 except ImportError:
-    from rebalance_strategies import create_rebalance_strategy
+    from config_loader import load_config
+    from jit import njit, prange, NUMBA_AVAILABLE
+    from rebalance_strategies import (
+        create_rebalance_strategy, TimeBasedRebalance, ThresholdBasedRebalance
+    )
+    from storage import read_table, table_exists, write_columnar_copy
 
+# Días que avanza cada paso mensual de la simulación (rebalanceo por tiempo)
+DAYS_PER_STEP = 30
 
-def load_config(config_path="config/settings.yaml"):
-    """Carga la configuración desde el archivo YAML."""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+# Columnas del historial antes de los valores por activo ({asset}_value)
+HISTORY_COLUMNS = [
+    'month', 'portfolio_value', 'withdrawal', 'base_withdrawal', 'contribution',
+    'total_withdrawals', 'total_contributions', 'total_rebalance_costs'
+]
 
-
-def load_asset_statistics(processed_path="data/processed/"):
+def load_asset_statistics(processed_path="data/processed/", storage_format="csv"):
     """
-    Carga las estadísticas de activos desde el archivo CSV.
+    Carga las estadísticas de activos desde el archivo CSV o Parquet.
     
     Returns:
         dict: Diccionario con media y std dev por activo
     """
     stats_path = os.path.join(processed_path, "asset_statistics.csv")
     
-    if not os.path.exists(stats_path):
+    if not table_exists(stats_path):
         raise FileNotFoundError(
             f"Archivo de estadísticas no encontrado: {stats_path}\n"
             "Ejecuta primero: python src/data_preprocessing.py"
         )
     
-    stats_df = pd.read_csv(stats_path)
+    stats_df = read_table(stats_path, storage_format)
     
     # Convertir a diccionario
     stats = {}
@@ -49,6 +61,37 @@ def load_asset_statistics(processed_path="data/processed/"):
     return stats
 
 
+def monthly_return_parameters(asset_stats, assets=None):
+    """
+    Media y desviación estándar mensuales por activo, como arrays.
+    
+    Args:
+        asset_stats: dict con estadísticas anualizadas por activo
+        assets: orden de los activos (por defecto, el de asset_stats); un
+            activo sin estadísticas tiene media y desviación 0
+        
+    Returns:
+        np.ndarray: media mensual por activo
+        np.ndarray: desviación estándar mensual por activo
+    """
+    if assets is None:
+        assets = list(asset_stats.keys())
+    
+    mean_annual = np.zeros(len(assets))
+    std_annual = np.zeros(len(assets))
+    for k, asset in enumerate(assets):
+        if asset == 'cash':
+            # Tasa libre de riesgo conservadora: 2% anual, muy baja volatilidad
+            mean_annual[k] = 0.02
+            std_annual[k] = 0.001
+        elif asset in asset_stats:
+            mean_annual[k] = asset_stats[asset]['mean_return']
+            std_annual[k] = asset_stats[asset]['std_dev']
+    
+    # Anualizar: dividir media por 12, std por sqrt(12)
+    return mean_annual / 12, std_annual / np.sqrt(12)
+
+
 def generate_monthly_returns(asset_stats, n_months, random_seed=None):
     """
     Genera retornos mensuales simulados usando distribución normal.
@@ -64,29 +107,52 @@ def generate_monthly_returns(asset_stats, n_months, random_seed=None):
     if random_seed is not None:
         np.random.seed(random_seed)
     
-    # Convertir estadísticas anuales a mensuales
-    monthly_returns = {}
+    assets = list(asset_stats.keys())
+    mean_monthly, std_monthly = monthly_return_parameters(asset_stats, assets)
     
-    for asset in asset_stats.keys():
-        # Para cash, usar tasa libre de riesgo baja (ej: 2% anual)
-        if asset == 'cash':
-            # Tasa libre de riesgo conservadora: 2% anual
-            mean_annual = 0.02
-            std_annual = 0.001  # Muy baja volatilidad
-        else:
-            stats = asset_stats[asset]
-            mean_annual = stats['mean_return']
-            std_annual = stats['std_dev']
-        
-        # Anualizar: dividir media por 12, std por sqrt(12)
-        mean_monthly = mean_annual / 12
-        std_monthly = std_annual / np.sqrt(12)
+    # Una sola extracción (activo por fila, mismo orden que una llamada por activo)
+    log_returns = np.random.normal(
+        mean_monthly[:, np.newaxis],
+        std_monthly[:, np.newaxis],
+        (len(assets), n_months)
+    )
+    
+    # log_returns.T ya tiene la disposición interna de pandas (una fila de
+    # memoria por columna): se envuelve sin copiar
+    return pd.DataFrame(log_returns.T, columns=assets, copy=False)
+
+
+def generate_all_returns(asset_stats, n_months, n_iterations, random_seed=None, assets=None,
+                         dtype=np.float64):
+    """
+    Genera los retornos mensuales de todas las iteraciones en una sola extracción.
+    
+    Usa np.random.default_rng (PCG64): una única matriz normal estándar de
+    forma (n_iterations, n_months, n_activos) escalada por activo, en lugar
+    de un DataFrame y una re-siembra por iteración.
+    
+    Args:
+        asset_stats: dict con estadísticas anualizadas por activo
+        n_months: número de meses a simular
+        n_iterations: número de iteraciones Monte Carlo
+        random_seed: semilla para reproducibilidad
+        assets: orden de los activos en el último eje (por defecto, el de
+            asset_stats); un activo sin estadísticas tiene retorno 0
+        dtype: np.float64 o np.float32 (la mitad de memoria; el generador
+            produce otra secuencia para cada tipo)
         
-        # Generar retornos logarítmicos mensuales
-        log_returns = np.random.normal(mean_monthly, std_monthly, n_months)
-        monthly_returns[asset] = log_returns
+    Returns:
+        np.ndarray: retornos logarítmicos mensuales (n_iterations, n_months, n_activos)
+    """
+    if assets is None:
+        assets = list(asset_stats.keys())
+    mean_monthly, std_monthly = monthly_return_parameters(asset_stats, assets)
     
-    return pd.DataFrame(monthly_returns)
+    rng = np.random.default_rng(random_seed)
+    returns = rng.standard_normal((n_iterations, n_months, len(assets)), dtype=dtype)
+    returns *= std_monthly
+    returns += mean_monthly
+    return returns
 
 
 def simulate_portfolio_path(
@@ -102,7 +168,9 @@ def simulate_portfolio_path(
     contribution_enabled=False,
     thirteenth_payment_months=None,
     thirteenth_payment_amount=0,
-    thirteenth_payment_enabled=False
+    thirteenth_payment_enabled=False,
+    withdrawal_schedule=None,
+    as_array=False
 ):
     """
     Simula un único camino de evolución de la cartera.
@@ -112,7 +180,8 @@ def simulate_portfolio_path(
         asset_stats: estadísticas de activos
         portfolio_config: configuración de la cartera
         rebalance_strategy: estrategia de rebalanceo
-        monthly_returns: DataFrame con retornos mensuales simulados
+        monthly_returns: retornos mensuales simulados, np.ndarray (n_months,
+            n_activos) en el orden de la asignación, o DataFrame por activo
         withdrawal_amount: monto de retiro mensual
         inflation_rate: tasa de inflación anual
         apply_inflation: si ajustar retiros por inflación
@@ -121,131 +190,194 @@ def simulate_portfolio_path(
         thirteenth_payment_months: lista de meses (1-indexed) donde se aplican décimos sueldos
         thirteenth_payment_amount: monto del décimo sueldo
         thirteenth_payment_enabled: si los décimos sueldos están habilitados
+        withdrawal_schedule: retiros por mes ya calculados con
+            compute_withdrawal_schedule() (None: se calculan aquí)
+        as_array: devolver el historial como np.ndarray (meses sobrevividos x
+            columnas de history_columns) en lugar de DataFrame
         
     Returns:
         pd.DataFrame: evolución del portafolio por mes
         dict: métricas finales
     """
-    n_months = len(monthly_returns)
     allocation = portfolio_config['allocation']
     
-    # Inicializar cartera
+    # Retornos como ndarray en el orden de la asignación (sin retorno: 0)
+    if isinstance(monthly_returns, pd.DataFrame):
+        monthly_returns = monthly_returns.reindex(
+            columns=list(allocation), fill_value=0.0
+        ).to_numpy()
+    
+    # Factores de crecimiento de todos los meses en una sola llamada a np.exp
+    return _simulate_path(
+        initial_capital,
+        asset_stats,
+        portfolio_config,
+        rebalance_strategy,
+        np.exp(monthly_returns),
+        withdrawal_amount,
+        inflation_rate,
+        apply_inflation,
+        periodic_contribution,
+        contribution_enabled,
+        thirteenth_payment_months,
+        thirteenth_payment_amount,
+        thirteenth_payment_enabled,
+        withdrawal_schedule,
+        as_array
+    )
+
+
+def _simulate_path(
+    initial_capital,
+    asset_stats,
+    portfolio_config,
+    rebalance_strategy,
+    monthly_growth,
+    withdrawal_amount,
+    inflation_rate=0.02,
+    apply_inflation=True,
+    periodic_contribution=0,
+    contribution_enabled=False,
+    thirteenth_payment_months=None,
+    thirteenth_payment_amount=0,
+    thirteenth_payment_enabled=False,
+    withdrawal_schedule=None,
+    as_array=False
+):
+    """
+    simulate_portfolio_path sobre factores de crecimiento ya calculados.
+    
+    Args:
+        monthly_growth: np.exp de los retornos mensuales, np.ndarray
+            (n_months, n_activos) en el orden de la asignación
+        (resto: como en simulate_portfolio_path)
+    """
+    n_months = len(monthly_growth)
+    allocation = portfolio_config['allocation']
+    
+    # Retiro base (ajustado por inflación) y décimos sueldos de cada mes
+    if withdrawal_schedule is None:
+        withdrawal_schedule = compute_withdrawal_schedule(
+            n_months,
+            withdrawal_amount,
+            inflation_rate,
+            apply_inflation,
+            thirteenth_payment_months,
+            thirteenth_payment_amount,
+            thirteenth_payment_enabled
+        )
+    base_withdrawals, extra_withdrawals = withdrawal_schedule
+    
+    # Estrategias conocidas: bucle mensual compilado con Numba
+    kernel_rebalance = _kernel_rebalance_params(rebalance_strategy, allocation)
+    if NUMBA_AVAILABLE and kernel_rebalance is not None:
+        return _simulate_path_compiled(
+            initial_capital,
+            allocation,
+            monthly_growth,
+            base_withdrawals,
+            extra_withdrawals,
+            periodic_contribution if contribution_enabled else 0,
+            kernel_rebalance,
+            as_array
+        )
+    
+    # Inicializar cartera: valores por activo como vector en el orden de la asignación
+    assets = list(allocation)
+    weights = np.array([allocation[asset] for asset in assets], dtype=np.float64)
     portfolio_value = initial_capital
-    asset_values = {
-        asset: portfolio_value * weight
-        for asset, weight in allocation.items()
-    }
+    asset_vals = portfolio_value * weights
+    contribution = periodic_contribution if contribution_enabled else 0
     
-    # Preparar historial
-    history = []
-    withdrawal = withdrawal_amount
+    # Preparar historial: una fila por mes (HISTORY_COLUMNS + valor por activo)
+    history = np.empty((n_months, len(HISTORY_COLUMNS) + len(assets)))
     total_withdrawals = 0
     total_contributions = 0
     total_rebalance_costs = 0
     months_survived = n_months
     
-    # Normalizar thirteenth_payment_months (convertir a 0-indexed)
-    if thirteenth_payment_months is None:
-        thirteenth_payment_months = []
-    thirteenth_payment_months_0indexed = [m - 1 for m in thirteenth_payment_months]
+    # Funciones de rebalanceo con estado propio de esta trayectoria; el
+    # rebalanceo por tiempo usa un índice de día entero en lugar de fechas
+    should_rebalance, rebalance = rebalance_strategy.step_functions()
     
-    # Fecha inicial (para el rebalanceo basado en tiempo)
-    current_date = datetime(2025, 1, 1)
+    # Posición de cada activo de la estrategia en el vector de valores
+    asset_index = {asset: k for k, asset in enumerate(assets)}
+    missing = [asset for asset in rebalance_strategy.assets if asset not in asset_index]
+    if missing:
+        raise ValueError(f"La estrategia de rebalanceo usa activos fuera de la asignación: {missing}")
+    if rebalance_strategy.assets == tuple(assets):
+        # Mismo orden: se trabaja sobre el vector sin copias por índice
+        rebalance_index = slice(None)
+    else:
+        rebalance_index = np.array([asset_index[asset] for asset in rebalance_strategy.assets], dtype=np.intp)
+    n_rebalance_assets = len(rebalance_strategy.assets)
     
     for month in range(n_months):
-        # Ajustar retiro por inflación si aplica
-        if apply_inflation and month > 0:
-            monthly_inflation = (1 + inflation_rate) ** (1/12) - 1
-            withdrawal = withdrawal * (1 + monthly_inflation)
-        
-        # Calcular retornos del mes
-        month_returns = monthly_returns.iloc[month]
-        
-        # Actualizar valores de activos con retornos
-        new_asset_values = {}
-        for asset in asset_values:
-            if asset in month_returns.index:
-                monthly_return = month_returns[asset]
-                new_asset_values[asset] = asset_values[asset] * np.exp(monthly_return)
-            else:
-                # Si no hay retorno, mantener valor (no debería pasar)
-                new_asset_values[asset] = asset_values[asset]
+        # Retiro base del mes (ya ajustado por inflación)
+        withdrawal = base_withdrawals[month]
+        
+        # Actualizar valores de activos con los retornos del mes
+        asset_vals = asset_vals * monthly_growth[month]
         
         # Calcular nuevo valor total
-        portfolio_value = sum(new_asset_values.values())
+        portfolio_value = float(asset_vals.sum())
         
         # Aplicar contribución periódica (después de retornos, antes de retiros)
-        contribution_this_month = 0
-        if contribution_enabled:
-            contribution_this_month = periodic_contribution
-            if contribution_this_month != 0:
-                portfolio_value += contribution_this_month
-                total_contributions += contribution_this_month
-                # Distribuir la contribución según la asignación actual
-                if portfolio_value > 0:
-                    for asset in new_asset_values:
-                        new_asset_values[asset] = (new_asset_values[asset] / 
-                                                  (portfolio_value - contribution_this_month) * 
-                                                  portfolio_value)
-        
-        # Determinar retiro total del mes
-        monthly_withdrawal = withdrawal
-        
-        # Agregar décimo sueldo si aplica en este mes
-        if thirteenth_payment_enabled and month in thirteenth_payment_months_0indexed:
-            thirteenth_amount = thirteenth_payment_amount
-            # Ajustar décimo sueldo por inflación si aplica
-            if apply_inflation and month > 0:
-                monthly_inflation = (1 + inflation_rate) ** (1/12) - 1
-                thirteenth_amount = thirteenth_payment_amount * ((1 + inflation_rate) ** ((month + 1) / 12))
-            monthly_withdrawal += thirteenth_amount
+        if contribution != 0:
+            invested = portfolio_value
+            portfolio_value += contribution
+            total_contributions += contribution
+            # Distribuir la contribución según la asignación actual (un solo
+            # factor de escala); una cartera vacía la recibe según la asignación
+            if invested > 0 and portfolio_value > 0:
+                asset_vals *= portfolio_value / invested
+            elif portfolio_value > 0:
+                asset_vals = portfolio_value * weights
+        
+        # Retiro total del mes (con décimo sueldo si aplica)
+        monthly_withdrawal = withdrawal + extra_withdrawals[month]
         
         # Realizar retiro
         if portfolio_value >= monthly_withdrawal:
             portfolio_value -= monthly_withdrawal
             total_withdrawals += monthly_withdrawal
             # Reducir proporcionalmente cada activo
-            for asset in new_asset_values:
-                new_asset_values[asset] *= (1 - monthly_withdrawal / (portfolio_value + monthly_withdrawal))
+            asset_vals *= (1 - monthly_withdrawal / (portfolio_value + monthly_withdrawal))
         else:
             # Capital agotado
             months_survived = month
             portfolio_value = 0
-            new_asset_values = {asset: 0 for asset in new_asset_values}
             break
         
-        # Verificar si se debe rebalancear
-        current_allocation = {
-            asset: value / portfolio_value if portfolio_value > 0 else 0
-            for asset, value in new_asset_values.items()
-        }
+        # Verificar si se debe rebalancear (asignaciones como vector)
+        current_values = asset_vals[rebalance_index]
+        if portfolio_value > 0:
+            current_allocation = current_values / portfolio_value
+        else:
+            current_allocation = np.zeros(n_rebalance_assets)
         
-        if rebalance_strategy.should_rebalance(current_allocation, current_date, portfolio_value):
-            new_asset_values, rebalance_cost = rebalance_strategy.rebalance(
-                new_asset_values, 
-                portfolio_value
-            )
+        if should_rebalance(current_allocation, month * DAYS_PER_STEP):
+            rebalanced_values, rebalance_cost = rebalance(current_values, portfolio_value)
+            if isinstance(rebalance_index, slice):
+                asset_vals = rebalanced_values
+            else:
+                asset_vals = np.zeros_like(asset_vals)
+                asset_vals[rebalance_index] = rebalanced_values
             portfolio_value -= rebalance_cost
             total_rebalance_costs += rebalance_cost
         
-        # Actualizar para siguiente mes
-        asset_values = new_asset_values
-        
         # Guardar estado
-        history.append({
-            'month': month + 1,
-            'portfolio_value': portfolio_value,
-            'withdrawal': monthly_withdrawal,
-            'base_withdrawal': withdrawal,
-            'contribution': contribution_this_month,
-            'total_withdrawals': total_withdrawals,
-            'total_contributions': total_contributions,
-            'total_rebalance_costs': total_rebalance_costs,
-            **{f'{asset}_value': new_asset_values.get(asset, 0) for asset in allocation.keys()}
-        })
-        
-        # Avanzar fecha
-        current_date += timedelta(days=30)
+        history[month, :len(HISTORY_COLUMNS)] = (
+            month + 1,
+            portfolio_value,
+            monthly_withdrawal,
+            withdrawal,
+            contribution,
+            total_withdrawals,
+            total_contributions,
+            total_rebalance_costs
+        )
+        history[month, len(HISTORY_COLUMNS):] = asset_vals
     
     # Calcular métricas finales
     net_flow = total_contributions - total_withdrawals
@@ -260,7 +392,647 @@ def simulate_portfolio_path(
         'total_return': (portfolio_value - initial_capital) / initial_capital if initial_capital > 0 else 0
     }
     
-    return pd.DataFrame(history), metrics
+    history = history[:months_survived]
+    if not as_array:
+        history = _history_frame(history, allocation)
+    return history, metrics
+
+
+def history_columns(allocation):
+    """
+    Columnas del historial de una trayectoria para una asignación dada.
+    
+    Returns:
+        list: HISTORY_COLUMNS seguidas de '{activo}_value' por activo
+    """
+    return HISTORY_COLUMNS + [f'{asset}_value' for asset in allocation]
+
+
+def histories_to_frame(histories, allocation, indices=None, simulation_ids=None):
+    """
+    Convierte simulaciones de monte_carlo_simulation en un único DataFrame.
+    
+    Args:
+        histories: np.ndarray (n, n_months, columnas) con NaN en los meses
+            posteriores al agotamiento del capital
+        allocation: asignación de la cartera
+        indices: posiciones en histories a incluir (None: todas)
+        simulation_ids: número de simulación de cada fila de histories
+            (None: posición + 1; p. ej. keep_histories + 1)
+        
+    Returns:
+        pd.DataFrame: historiales apilados con la columna 'simulation' (1-indexed)
+    """
+    if indices is None:
+        indices = np.arange(len(histories))
+    indices = np.asarray(indices, dtype=np.int64)
+    if simulation_ids is None:
+        simulation_ids = np.arange(1, len(histories) + 1)
+    selected = histories[indices]
+    n_months = selected.shape[1]
+    
+    rows = selected.reshape(-1, selected.shape[2])
+    simulation = np.repeat(np.asarray(simulation_ids)[indices], n_months)
+    # Meses simulados (sin el relleno tras agotarse el capital)
+    keep = ~np.isnan(rows[:, 0])
+    
+    history_df = _history_frame(rows[keep], allocation)
+    history_df['simulation'] = simulation[keep]
+    return history_df
+
+
+def _history_frame(history, allocation):
+    """
+    Convierte el historial de una trayectoria (ndarray) en DataFrame.
+    
+    Args:
+        history: np.ndarray (meses x columnas de HISTORY_COLUMNS seguidas de
+            los valores por activo)
+        allocation: asignación de la cartera (define los nombres de activos)
+        
+    Returns:
+        pd.DataFrame: historial con 'month' como entero
+    """
+    history_df = pd.DataFrame(history, columns=history_columns(allocation))
+    history_df['month'] = history_df['month'].astype(np.int64)
+    return history_df
+
+
+def compute_withdrawal_schedule(
+    n_months,
+    withdrawal_amount,
+    inflation_rate=0.02,
+    apply_inflation=True,
+    thirteenth_payment_months=None,
+    thirteenth_payment_amount=0,
+    thirteenth_payment_enabled=False
+):
+    """
+    Calcula los retiros de cada mes una sola vez para todas las simulaciones.
+    
+    Ambos se ajustan con una tabla de factores de inflación acumulada,
+    (1 + inflation_rate) ** (mes / 12): el retiro base del mes m (0-indexed)
+    usa el factor de m meses y el décimo sueldo el de m + 1 meses.
+    
+    Args:
+        n_months: número de meses
+        thirteenth_payment_months: lista de meses (1-indexed) con décimo sueldo
+        (resto: como en simulate_portfolio_path)
+        
+    Returns:
+        np.ndarray: retiro base por mes
+        np.ndarray: retiro extra por mes (décimos sueldos, 0 en el resto)
+    """
+    # Inflación acumulada tras 0..n_months meses (1 si no se ajusta)
+    if apply_inflation:
+        inflation_factors = (1 + inflation_rate) ** (np.arange(n_months + 1) / 12)
+    else:
+        inflation_factors = np.ones(n_months + 1)
+    base_withdrawals = withdrawal_amount * inflation_factors[:n_months]
+    
+    extra_withdrawals = np.zeros(n_months)
+    if thirteenth_payment_enabled:
+        months = np.unique([m - 1 for m in (thirteenth_payment_months or [])]).astype(np.int64)
+        months = months[(months >= 0) & (months < n_months)]
+        # El décimo sueldo del primer mes no se ajusta
+        extra_withdrawals[months] = thirteenth_payment_amount * np.where(
+            months > 0, inflation_factors[months + 1], 1.0
+        )
+    
+    return base_withdrawals, extra_withdrawals
+
+
+def _kernel_rebalance_params(rebalance_strategy, allocation):
+    """
+    Parámetros de rebalanceo para _simulate_path_kernel.
+    
+    Returns:
+        tuple o None: (target, period_days, threshold, transaction_cost), con
+            period_days = -1 para el rebalanceo por umbral; None si la
+            estrategia no es una de las conocidas o sus activos no siguen el
+            orden de la asignación (se usa el bucle en Python)
+    """
+    if rebalance_strategy.assets != tuple(allocation):
+        return None
+    if isinstance(rebalance_strategy, TimeBasedRebalance):
+        period_days, threshold = rebalance_strategy._period_days, 0.0
+    elif isinstance(rebalance_strategy, ThresholdBasedRebalance):
+        period_days, threshold = -1, float(rebalance_strategy.threshold)
+    else:
+        return None
+    return (
+        rebalance_strategy.target_arr,
+        period_days,
+        threshold,
+        float(rebalance_strategy.transaction_cost)
+    )
+
+
+def _simulate_path_compiled(
+    initial_capital,
+    allocation,
+    monthly_growth,
+    base_withdrawals,
+    extra_withdrawals,
+    contribution,
+    kernel_rebalance,
+    as_array=False
+):
+    """
+    simulate_portfolio_path con el bucle mensual en _simulate_path_kernel.
+    
+    El historial se convierte a DataFrame una vez al final.
+    """
+    n_months = len(monthly_growth)
+    target, period_days, threshold, transaction_cost = kernel_rebalance
+    
+    history, totals, months_survived = _simulate_path_kernel(
+        float(initial_capital),
+        np.fromiter(allocation.values(), dtype=np.float64, count=len(allocation)),
+        np.ascontiguousarray(monthly_growth),
+        base_withdrawals,
+        extra_withdrawals,
+        float(contribution),
+        target,
+        period_days,
+        threshold,
+        transaction_cost,
+        DAYS_PER_STEP
+    )
+    
+    if not as_array:
+        history = _history_frame(history, allocation)
+    
+    portfolio_value, total_withdrawals, total_contributions, total_rebalance_costs = totals
+    metrics = {
+        'final_value': portfolio_value,
+        'total_withdrawals': total_withdrawals,
+        'total_contributions': total_contributions,
+        'net_flow': total_contributions - total_withdrawals,
+        'total_rebalance_costs': total_rebalance_costs,
+        'months_survived': months_survived,
+        'survived_full_period': months_survived == n_months,
+        'total_return': (portfolio_value - initial_capital) / initial_capital if initial_capital > 0 else 0
+    }
+    
+    return history, metrics
+
+
+@njit(cache=True)
+def _simulate_path_kernel(
+    initial_capital,
+    weights,
+    growth,
+    base_withdrawals,
+    extra_withdrawals,
+    contribution,
+    target,
+    period_days,
+    threshold,
+    transaction_cost,
+    days_per_step
+):
+    """
+    Bucle mensual de simulate_portfolio_path sobre arrays contiguos.
+    
+    Reproduce las mismas operaciones que el bucle en Python: retornos,
+    contribución, retiro (con décimos sueldos) y rebalanceo por tiempo
+    (period_days >= 0) o por umbral (period_days = -1).
+    
+    Returns:
+        np.ndarray: historial (meses sobrevividos x columnas de HISTORY_COLUMNS
+            seguidas de los valores por activo)
+        tuple: (valor final, retiros, contribuciones, costos de rebalanceo)
+        int: meses sobrevividos
+    """
+    n_months, n_assets = growth.shape
+    history = np.zeros((n_months, 8 + n_assets))
+    totals, months_survived = _simulate_path_into(
+        history,
+        initial_capital,
+        weights,
+        growth,
+        base_withdrawals,
+        extra_withdrawals,
+        contribution,
+        target,
+        period_days,
+        threshold,
+        transaction_cost,
+        days_per_step
+    )
+    return history[:months_survived], totals, months_survived
+
+
+@njit(cache=True)
+def _simulate_path_into(
+    history,
+    initial_capital,
+    weights,
+    growth,
+    base_withdrawals,
+    extra_withdrawals,
+    contribution,
+    target,
+    period_days,
+    threshold,
+    transaction_cost,
+    days_per_step
+):
+    """
+    Cuerpo de _simulate_path_kernel: escribe cada mes simulado en history.
+    
+    Las filas de los meses posteriores al agotamiento del capital no se
+    modifican, de modo que el llamador decide su contenido (ceros o NaN).
+    
+    Args:
+        history: np.ndarray (n_months, columnas) de destino
+        (resto): como _simulate_path_kernel
+    
+    Returns:
+        tuple: (valor final, retiros, contribuciones, costos de rebalanceo)
+        int: meses sobrevividos
+    """
+    n_months, n_assets = growth.shape
+    values = initial_capital * weights
+    
+    portfolio_value = initial_capital
+    total_withdrawals = 0.0
+    total_contributions = 0.0
+    total_rebalance_costs = 0.0
+    months_survived = n_months
+    last_rebalance_day = -1
+    
+    for month in range(n_months):
+        withdrawal = base_withdrawals[month]
+        
+        # Retornos del mes y nuevo valor total
+        portfolio_value = 0.0
+        for k in range(n_assets):
+            values[k] = values[k] * growth[month, k]
+            portfolio_value += values[k]
+        
+        # Contribución periódica, distribuida según la asignación actual
+        if contribution != 0:
+            invested = portfolio_value
+            portfolio_value += contribution
+            total_contributions += contribution
+            if invested > 0 and portfolio_value > 0:
+                scale = portfolio_value / invested
+                for k in range(n_assets):
+                    values[k] *= scale
+            elif portfolio_value > 0:
+                for k in range(n_assets):
+                    values[k] = portfolio_value * weights[k]
+        
+        monthly_withdrawal = withdrawal + extra_withdrawals[month]
+        
+        if portfolio_value >= monthly_withdrawal:
+            portfolio_value -= monthly_withdrawal
+            total_withdrawals += monthly_withdrawal
+            scale = 1 - monthly_withdrawal / (portfolio_value + monthly_withdrawal)
+            for k in range(n_assets):
+                values[k] *= scale
+        else:
+            # Capital agotado
+            months_survived = month
+            portfolio_value = 0.0
+            break
+        
+        # Rebalanceo por tiempo o por umbral
+        if period_days >= 0:
+            day = month * days_per_step
+            do_rebalance = last_rebalance_day < 0 or day - last_rebalance_day >= period_days
+            if do_rebalance:
+                last_rebalance_day = day
+        else:
+            do_rebalance = False
+            for k in range(n_assets):
+                allocation = values[k] / portfolio_value if portfolio_value > 0 else 0.0
+                if abs(allocation - target[k]) > threshold:
+                    do_rebalance = True
+        
+        if do_rebalance:
+            total_change = 0.0
+            for k in range(n_assets):
+                allocation = values[k] / portfolio_value if portfolio_value > 0 else 0.0
+                total_change += abs(target[k] - allocation)
+            cost = portfolio_value * (total_change / 2) * transaction_cost
+            for k in range(n_assets):
+                values[k] = (portfolio_value - cost) * target[k]
+            portfolio_value -= cost
+            total_rebalance_costs += cost
+        
+        # Guardar estado
+        history[month, 0] = month + 1
+        history[month, 1] = portfolio_value
+        history[month, 2] = monthly_withdrawal
+        history[month, 3] = withdrawal
+        history[month, 4] = contribution
+        history[month, 5] = total_withdrawals
+        history[month, 6] = total_contributions
+        history[month, 7] = total_rebalance_costs
+        for k in range(n_assets):
+            history[month, 8 + k] = values[k]
+    
+    totals = (portfolio_value, total_withdrawals, total_contributions, total_rebalance_costs)
+    return totals, months_survived
+
+
+@njit(parallel=True, cache=True)
+def _simulate_paths_kernel(
+    histories,
+    initial_capital,
+    weights,
+    growth,
+    base_withdrawals,
+    extra_withdrawals,
+    contribution,
+    target,
+    period_days,
+    threshold,
+    transaction_cost,
+    days_per_step
+):
+    """
+    _simulate_path_kernel para todas las trayectorias de un lote, repartidas
+    entre los hilos de Numba (prange). Cada trayectoria escribe su historial
+    directamente en histories, sin arrays intermedios.
+    
+    Args:
+        histories: np.ndarray (n, n_months, columnas) de destino; los meses
+            posteriores al agotamiento del capital conservan su valor inicial
+        growth: factores de crecimiento (n, n_months, activos), contiguo
+        (resto): como _simulate_path_kernel
+    
+    Returns:
+        np.ndarray: (n, 4) valor final, retiros, contribuciones y costos de
+            rebalanceo
+        np.ndarray: meses sobrevividos (n,)
+    """
+    n_paths = growth.shape[0]
+    totals = np.zeros((n_paths, 4))
+    months_survived = np.zeros(n_paths, dtype=np.int64)
+    
+    for p in prange(n_paths):
+        # Cada trayectoria escribe directamente en su plano del resultado
+        path_totals, survived = _simulate_path_into(
+            histories[p],
+            initial_capital,
+            weights,
+            growth[p],
+            base_withdrawals,
+            extra_withdrawals,
+            contribution,
+            target,
+            period_days,
+            threshold,
+            transaction_cost,
+            days_per_step
+        )
+        for k in range(4):
+            totals[p, k] = path_totals[k]
+        months_survived[p] = survived
+    
+    return totals, months_survived
+
+
+def _metrics_frame(initial_capital, n_months, final_value, total_withdrawals,
+                   total_contributions, total_rebalance_costs, months_survived):
+    """
+    Métricas por trayectoria (como simulate_portfolio_path) a partir de arrays.
+    
+    Returns:
+        pd.DataFrame: una fila por trayectoria
+    """
+    return pd.DataFrame({
+        'final_value': final_value,
+        'total_withdrawals': total_withdrawals,
+        'total_contributions': total_contributions,
+        'net_flow': total_contributions - total_withdrawals,
+        'total_rebalance_costs': total_rebalance_costs,
+        'months_survived': months_survived,
+        'survived_full_period': months_survived == n_months,
+        'total_return': (final_value - initial_capital) / initial_capital if initial_capital > 0 else 0.0
+    })
+
+
+def _simulate_paths_vectorized(
+    initial_capital,
+    weights,
+    growth,
+    base_withdrawals,
+    extra_withdrawals,
+    contribution,
+    target,
+    period_days,
+    threshold,
+    transaction_cost,
+    days_per_step
+):
+    """
+    Simula todas las trayectorias de un lote a la vez sobre arrays (n, activos).
+    
+    Mismas operaciones que _simulate_path_kernel, pero cada paso mensual se
+    aplica a todas las trayectorias vivas con operaciones vectoriales de
+    NumPy; las que agotan el capital salen del conjunto activo. Se usa cuando
+    Numba no está instalado. Internamente el tiempo es el primer eje, de modo
+    que el plano (n, activos) de cada mes es contiguo en memoria.
+    
+    Returns:
+        np.ndarray: historiales (n, n_months, columnas) con NaN tras agotarse
+            el capital
+        pd.DataFrame: métricas por trayectoria (como simulate_portfolio_path)
+    """
+    n_paths, n_months, n_assets = growth.shape
+    n_fixed = len(HISTORY_COLUMNS)
+    # Orden (tiempo, trayectoria, columna): cada mes se lee y escribe contiguo
+    growth = np.ascontiguousarray(growth.transpose(1, 0, 2))
+    history = np.full((n_months, n_paths, n_fixed + n_assets), np.nan)
+    
+    # Estado de las trayectorias vivas (ids: su posición en el lote)
+    ids = np.arange(n_paths)
+    values = np.tile(initial_capital * weights, (n_paths, 1))
+    portfolio_value = np.full(n_paths, float(initial_capital))
+    total_withdrawals = np.zeros(n_paths)
+    total_contributions = np.zeros(n_paths)
+    total_rebalance_costs = np.zeros(n_paths)
+    
+    # Resultados finales (las trayectorias agotadas terminan con valor 0)
+    final_value = np.zeros(n_paths)
+    final_withdrawals = np.zeros(n_paths)
+    final_contributions = np.zeros(n_paths)
+    final_rebalance_costs = np.zeros(n_paths)
+    months_survived = np.full(n_paths, n_months, dtype=np.int64)
+    last_rebalance_day = -1
+    
+    for month in range(n_months):
+        withdrawal = base_withdrawals[month]
+        month_growth = growth[month] if len(ids) == n_paths else growth[month, ids]
+        
+        # Retornos del mes y nuevo valor total
+        values = values * month_growth
+        portfolio_value = values.sum(axis=1)
+        
+        # Contribución periódica, distribuida según la asignación actual
+        if contribution != 0:
+            invested = portfolio_value
+            portfolio_value = portfolio_value + contribution
+            total_contributions = total_contributions + contribution
+            scaled = (invested > 0) & (portfolio_value > 0)
+            values[scaled] *= (portfolio_value[scaled] / invested[scaled])[:, np.newaxis]
+            empty = ~scaled & (portfolio_value > 0)
+            if empty.any():
+                values[empty] = portfolio_value[empty, np.newaxis] * weights
+        
+        monthly_withdrawal = withdrawal + extra_withdrawals[month]
+        
+        # Trayectorias que agotan el capital este mes
+        alive = portfolio_value >= monthly_withdrawal
+        if not alive.all():
+            depleted = ids[~alive]
+            months_survived[depleted] = month
+            final_withdrawals[depleted] = total_withdrawals[~alive]
+            final_contributions[depleted] = total_contributions[~alive]
+            final_rebalance_costs[depleted] = total_rebalance_costs[~alive]
+            
+            ids = ids[alive]
+            values = values[alive]
+            portfolio_value = portfolio_value[alive]
+            total_withdrawals = total_withdrawals[alive]
+            total_contributions = total_contributions[alive]
+            total_rebalance_costs = total_rebalance_costs[alive]
+            if len(ids) == 0:
+                break
+        
+        portfolio_value = portfolio_value - monthly_withdrawal
+        total_withdrawals = total_withdrawals + monthly_withdrawal
+        values = values * (1 - monthly_withdrawal / (portfolio_value + monthly_withdrawal))[:, np.newaxis]
+        
+        # Rebalanceo por tiempo (igual para todas) o por umbral (por trayectoria)
+        if period_days >= 0:
+            day = month * days_per_step
+            rebalance_rows = None
+            if last_rebalance_day < 0 or day - last_rebalance_day >= period_days:
+                last_rebalance_day = day
+                rebalance_rows = np.ones(len(ids), dtype=bool)
+        else:
+            allocation = _safe_allocation(values, portfolio_value)
+            rebalance_rows = (np.abs(allocation - target) > threshold).any(axis=1)
+        
+        if rebalance_rows is not None and rebalance_rows.any():
+            rows_value = portfolio_value[rebalance_rows]
+            allocation = _safe_allocation(values[rebalance_rows], rows_value)
+            total_change = np.abs(target - allocation).sum(axis=1)
+            cost = rows_value * (total_change / 2) * transaction_cost
+            values[rebalance_rows] = (rows_value - cost)[:, np.newaxis] * target
+            portfolio_value[rebalance_rows] = rows_value - cost
+            total_rebalance_costs[rebalance_rows] += cost
+        
+        # Guardar estado
+        month_history = history[month]
+        month_history[ids, 0] = month + 1
+        month_history[ids, 1] = portfolio_value
+        month_history[ids, 2] = monthly_withdrawal
+        month_history[ids, 3] = withdrawal
+        month_history[ids, 4] = contribution
+        month_history[ids, 5] = total_withdrawals
+        month_history[ids, 6] = total_contributions
+        month_history[ids, 7] = total_rebalance_costs
+        month_history[ids, n_fixed:] = values
+    
+    # Trayectorias que completaron el horizonte
+    final_value[ids] = portfolio_value
+    final_withdrawals[ids] = total_withdrawals
+    final_contributions[ids] = total_contributions
+    final_rebalance_costs[ids] = total_rebalance_costs
+    
+    metrics = _metrics_frame(
+        initial_capital, n_months, final_value, final_withdrawals,
+        final_contributions, final_rebalance_costs, months_survived
+    )
+    
+    return history.transpose(1, 0, 2), metrics
+
+
+def _safe_allocation(values, portfolio_value):
+    """Asignaciones por fila (0 donde el valor de la cartera no es positivo)."""
+    allocation = np.zeros_like(values)
+    positive = portfolio_value > 0
+    allocation[positive] = values[positive] / portfolio_value[positive, np.newaxis]
+    return allocation
+
+
+def _simulate_batch(growth_batch, path_args):
+    """
+    Simula un lote de trayectorias (trabajo de un proceso de monte_carlo_simulation).
+    
+    La estrategia de rebalanceo se resuelve una vez por lote. Las estrategias
+    conocidas se simulan con todo el lote en una llamada: el núcleo compilado
+    en paralelo (_simulate_paths_kernel, con Numba) o la versión vectorial
+    (_simulate_paths_vectorized); el resto, con el bucle en Python
+    trayectoria por trayectoria.
+    
+    Args:
+        growth_batch: factores de crecimiento np.exp(retornos), np.ndarray
+            (n_lote, n_months, n_activos)
+        path_args: tupla con el resto de argumentos de simulate_portfolio_path
+            (todos salvo monthly_returns, que va en quinta posición)
+        
+    Returns:
+        np.ndarray: historiales (n_lote, n_months, columnas) con NaN tras
+            agotarse el capital
+        pd.DataFrame: métricas por trayectoria, en el orden del lote
+    """
+    (initial_capital, _, portfolio_config, rebalance_strategy, _, _, _,
+     periodic_contribution, contribution_enabled, _, _, _, withdrawal_schedule) = path_args
+    allocation = portfolio_config['allocation']
+    n_paths, n_months = growth_batch.shape[:2]
+    base_withdrawals, extra_withdrawals = withdrawal_schedule
+    contribution = periodic_contribution if contribution_enabled else 0
+    
+    kernel_rebalance = _kernel_rebalance_params(rebalance_strategy, allocation)
+    if kernel_rebalance is not None:
+        weights = np.fromiter(allocation.values(), dtype=np.float64, count=len(allocation))
+        if not NUMBA_AVAILABLE:
+            return _simulate_paths_vectorized(
+                float(initial_capital),
+                weights,
+                growth_batch,
+                base_withdrawals,
+                extra_withdrawals,
+                contribution,
+                *kernel_rebalance,
+                DAYS_PER_STEP
+            )
+        
+        # Reservado con NumPy (más rápido que dentro del núcleo)
+        histories = np.full((n_paths, n_months, len(history_columns(allocation))), np.nan)
+        totals, months_survived = _simulate_paths_kernel(
+            histories,
+            float(initial_capital),
+            weights,
+            np.ascontiguousarray(growth_batch),
+            base_withdrawals,
+            extra_withdrawals,
+            float(contribution),
+            *kernel_rebalance,
+            DAYS_PER_STEP
+        )
+        metrics = _metrics_frame(
+            initial_capital, n_months, *totals.T, months_survived
+        )
+        return histories, metrics
+    
+    histories = np.full((n_paths, n_months, len(history_columns(allocation))), np.nan)
+    all_metrics = []
+    head, tail = path_args[:4], path_args[4:]
+    for i, monthly_growth in enumerate(growth_batch):
+        history, metrics = _simulate_path(*head, monthly_growth, *tail, as_array=True)
+        histories[i, :len(history)] = history
+        all_metrics.append(metrics)
+    
+    return histories, pd.DataFrame(all_metrics)
 
 
 def monte_carlo_simulation(
@@ -278,18 +1050,32 @@ def monte_carlo_simulation(
     thirteenth_payment_months=None,
     thirteenth_payment_amount=0,
     thirteenth_payment_enabled=False,
-    random_seed=42
+    random_seed=42,
+    n_jobs=1,
+    keep_histories=None,
+    returns_dtype=np.float64
 ):
     """
     Ejecuta simulación Monte Carlo completa.
     
+    Con n_jobs distinto de 1 las iteraciones se reparten en lotes entre
+    procesos. Los retornos se generan antes de repartirlas, así que el
+    resultado no depende del número de procesos.
+    
+    Args:
+        n_jobs: número de procesos (1: secuencial; -1 o None: todos los núcleos)
+        keep_histories: índices (0-indexed) de las simulaciones cuyo historial
+            se conserva, en ese orden; None conserva todos. Los historiales
+            de cada lote se descartan en cuanto se procesan sus métricas
+        returns_dtype: tipo del tensor de retornos (np.float32 reduce su
+            memoria a la mitad; valores y totales se acumulan en float64)
+    
     Returns:
-        list: lista de DataFrames con historial de cada simulación
+        np.ndarray: historiales (n_iterations o len(keep_histories), n_months,
+            columnas de history_columns), con NaN tras agotarse el capital;
+            ver histories_to_frame
         pd.DataFrame: DataFrame con métricas de todas las simulaciones
     """
-    all_histories = []
-    all_metrics = []
-    
     # Verificar si la cartera usa cash y agregarlo a asset_stats si es necesario
     allocation = portfolio_config['allocation']
     if 'cash' in allocation and allocation['cash'] > 0 and 'cash' not in asset_stats:
@@ -298,39 +1084,82 @@ def monte_carlo_simulation(
     
     print(f"Ejecutando {n_iterations} simulaciones Monte Carlo...")
     
-    for i in range(n_iterations):
-        if (i + 1) % 1000 == 0:
-            print(f"  Progreso: {i + 1}/{n_iterations}")
-        
-        # Generar retornos para esta iteración
-        monthly_returns = generate_monthly_returns(
-            asset_stats, 
-            n_months, 
-            random_seed=random_seed + i if random_seed else None
-        )
-        
-        # Simular camino
-        history, metrics = simulate_portfolio_path(
-            initial_capital,
-            asset_stats,
-            portfolio_config,
-            rebalance_strategy,
-            monthly_returns,
+    # Retornos de todas las iteraciones en una sola extracción
+    all_returns = generate_all_returns(
+        asset_stats,
+        n_months,
+        n_iterations,
+        random_seed=random_seed,
+        assets=list(allocation),
+        dtype=returns_dtype
+    )
+    # Factores de crecimiento: un solo np.exp sobre el tensor, en el mismo array
+    all_growth = np.exp(all_returns, out=all_returns)
+    
+    path_args = (
+        initial_capital,
+        asset_stats,
+        portfolio_config,
+        rebalance_strategy,
+        withdrawal_amount,
+        inflation_rate,
+        apply_inflation,
+        periodic_contribution,
+        contribution_enabled,
+        thirteenth_payment_months,
+        thirteenth_payment_amount,
+        thirteenth_payment_enabled,
+        # Retiros por mes: se calculan una vez para todas las iteraciones
+        compute_withdrawal_schedule(
+            n_months,
             withdrawal_amount,
             inflation_rate,
             apply_inflation,
-            periodic_contribution,
-            contribution_enabled,
             thirteenth_payment_months,
             thirteenth_payment_amount,
             thirteenth_payment_enabled
         )
-        
-        history['simulation'] = i + 1
-        all_histories.append(history)
+    )
+    
+    n_workers = (os.cpu_count() or 1) if n_jobs in (None, -1) else n_jobs
+    n_workers = max(1, min(n_workers, n_iterations))
+    
+    # Historiales conservados; los meses no simulados quedan en NaN
+    if keep_histories is None:
+        keep_histories = np.arange(n_iterations)
+    keep_histories = np.asarray(keep_histories, dtype=np.int64)
+    all_histories = np.full(
+        (len(keep_histories), n_months, len(history_columns(allocation))), np.nan
+    )
+    all_metrics = []
+    
+    def collect(start, batch_result):
+        histories, metrics = batch_result
+        selected = (keep_histories >= start) & (keep_histories < start + len(histories))
+        all_histories[selected] = histories[keep_histories[selected] - start]
         all_metrics.append(metrics)
     
-    metrics_df = pd.DataFrame(all_metrics)
+    if n_workers > 1:
+        # Varios lotes por proceso para equilibrar la carga
+        batches = np.array_split(all_growth, n_workers * 4)
+        starts = np.cumsum([0] + [len(batch) for batch in batches[:-1]])
+        # "spawn": hacer fork con el pool de hilos de Numba activo puede bloquearse
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for start, batch_result in zip(starts, executor.map(_simulate_batch, batches, repeat(path_args))):
+                collect(start, batch_result)
+        print(f"  Progreso: {n_iterations}/{n_iterations} ({n_workers} procesos)")
+    else:
+        # Lotes de 1000 iteraciones para informar el progreso
+        for start in range(0, n_iterations, 1000):
+            collect(start, _simulate_batch(all_growth[start:start + 1000], path_args))
+            done = min(start + 1000, n_iterations)
+            if done % 1000 == 0:
+                print(f"  Progreso: {done}/{n_iterations}")
+    
+    metrics_df = pd.concat(all_metrics, ignore_index=True)
     
     return all_histories, metrics_df
 
@@ -339,8 +1168,12 @@ def run_simulation(config_path="config/settings.yaml"):
     """
     Función principal que ejecuta todas las simulaciones.
     """
-    # Cargar configuración
+    # Cargar configuración (cada sección se consulta una sola vez)
     config = load_config(config_path)
+    project_config = config['project']
+    simulation_config = config['simulation']
+    data_config = config['data_source']
+    output_dir = project_config['output_dir']
     
     print("=" * 60)
     print("🎲 SIMULACIÓN MONTE CARLO DE CARTERAS")
@@ -348,16 +1181,21 @@ def run_simulation(config_path="config/settings.yaml"):
     
     # Cargar estadísticas de activos
     print("\n1. Cargando estadísticas de activos...")
-    asset_stats = load_asset_statistics(config['data_source']['processed_path'])
+    asset_stats = load_asset_statistics(
+        data_config['processed_path'],
+        data_config.get('storage_format', 'csv')
+    )
     
     # Parámetros de simulación
-    initial_capital = config['project']['initial_capital']
-    n_years = config['project']['simulation_horizon_years']
+    initial_capital = project_config['initial_capital']
+    n_years = project_config['simulation_horizon_years']
     n_months = n_years * 12
-    withdrawal_amount = config['project']['withdrawals']['amount']
-    n_iterations = config['simulation']['montecarlo_iterations']
-    random_seed = config['project']['random_seed']
-    apply_inflation = config['simulation']['inflation_adjustment']
+    withdrawal_amount = project_config['withdrawals']['amount']
+    n_iterations = simulation_config['montecarlo_iterations']
+    random_seed = project_config['random_seed']
+    apply_inflation = simulation_config['inflation_adjustment']
+    n_jobs = simulation_config.get('n_jobs', 1)
+    returns_dtype = np.dtype(simulation_config.get('returns_dtype', 'float64'))
     
     # Parámetros de contribuciones y cambios en retiros
     contributions_config = config.get('contributions', {})
@@ -376,7 +1214,7 @@ def run_simulation(config_path="config/settings.yaml"):
         print(f"  📅 Décimos sueldos: ${thirteenth_payment_amount:,.2f} en meses {thirteenth_payment_months}")
     
     # Crear directorio de resultados
-    os.makedirs(config['project']['output_dir'], exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     
     # Ejecutar para cada cartera y escenario
     all_results = {}
@@ -398,7 +1236,11 @@ def run_simulation(config_path="config/settings.yaml"):
                 transaction_cost=scenario_params['transaction_cost']
             )
             
-            # Ejecutar simulación
+            # Historiales a guardar (solo algunos para no ocupar mucho espacio)
+            sample_rng = np.random.default_rng(random_seed)
+            sample_indices = sample_rng.choice(n_iterations, min(100, n_iterations), replace=False)
+            
+            # Ejecutar simulación (conservando solo los historiales de la muestra)
             histories, metrics_df = monte_carlo_simulation(
                 initial_capital=initial_capital,
                 asset_stats=asset_stats,
@@ -414,7 +1256,10 @@ def run_simulation(config_path="config/settings.yaml"):
                 thirteenth_payment_months=thirteenth_payment_months,
                 thirteenth_payment_amount=thirteenth_payment_amount,
                 thirteenth_payment_enabled=thirteenth_payment_enabled,
-                random_seed=random_seed
+                random_seed=random_seed,
+                n_jobs=n_jobs,
+                keep_histories=sample_indices,
+                returns_dtype=returns_dtype
             )
             
             # Guardar resultados
@@ -422,20 +1267,23 @@ def run_simulation(config_path="config/settings.yaml"):
             
             # Guardar métricas
             metrics_path = os.path.join(
-                config['project']['output_dir'],
+                output_dir,
                 f"metrics_{result_key}.csv"
             )
             metrics_df.to_csv(metrics_path, index=False)
+            write_columnar_copy(metrics_df, metrics_path)
             
-            # Guardar historiales (solo algunos para no ocupar mucho espacio)
-            sample_indices = np.random.choice(len(histories), min(100, len(histories)), replace=False)
-            sample_histories = [histories[i] for i in sample_indices]
-            histories_df = pd.concat(sample_histories, ignore_index=True)
+            # Guardar historiales de la muestra
+            histories_df = histories_to_frame(
+                histories, portfolio_config['allocation'],
+                simulation_ids=sample_indices + 1
+            )
             histories_path = os.path.join(
-                config['project']['output_dir'],
+                output_dir,
                 f"histories_{result_key}.csv"
             )
             histories_df.to_csv(histories_path, index=False)
+            write_columnar_copy(histories_df, histories_path)
             
             portfolio_results[scenario_name] = {
                 'histories': histories,
@@ -453,7 +1301,7 @@ def run_simulation(config_path="config/settings.yaml"):
     print("\n" + "=" * 60)
     print("✅ SIMULACIONES COMPLETADAS")
     print("=" * 60)
-    print(f"Resultados guardados en: {config['project']['output_dir']}")
+    print(f"Resultados guardados en: {output_dir}")
     
     return all_results
 
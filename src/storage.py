@@ -0,0 +1,237 @@
+"""
+Lectura y escritura de tablas (CSV, Parquet o Feather) para los artefactos del proyecto.
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+FORMAT_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+
+# Formatos binarios columnares (requieren pyarrow)
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+
+def resolve_format(fmt):
+    """
+    Devuelve el formato efectivo de almacenamiento.
+
+    Si se pide Parquet o Feather pero pyarrow no está instalado, se usa CSV.
+
+    Args:
+        fmt: 'csv', 'parquet' o 'feather'
+
+    Returns:
+        str: formato que realmente se utilizará
+    """
+    fmt = (fmt or 'csv').lower()
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Formato de almacenamiento no soportado: {fmt}")
+    if fmt in COLUMNAR_FORMATS and not PARQUET_AVAILABLE:
+        return 'csv'
+    return fmt
+
+
+def table_path(path, fmt):
+    """Cambia la extensión de una ruta según el formato indicado."""
+    base, _ = os.path.splitext(path)
+    return base + FORMAT_EXTENSIONS[fmt]
+
+
+def write_table(df, path, fmt='csv', index=True):
+    """
+    Guarda un DataFrame en CSV, Parquet o Feather.
+
+    Feather no admite índices arbitrarios: con index=True el índice se
+    guarda como primera columna.
+
+    Args:
+        df: DataFrame a guardar
+        path: ruta de destino (la extensión se ajusta al formato)
+        fmt: 'csv', 'parquet' o 'feather'
+        index: si se guarda el índice
+
+    Returns:
+        str: ruta del archivo escrito
+    """
+    fmt = resolve_format(fmt)
+    path = table_path(path, fmt)
+
+    if fmt == 'parquet':
+        df.to_parquet(path, engine='pyarrow', compression='zstd', index=index)
+    elif fmt == 'feather':
+        df = df.reset_index() if index else df.reset_index(drop=True)
+        df.to_feather(path, compression='zstd')
+    else:
+        df.to_csv(path, index=index)
+
+    return path
+
+
+def write_columnar_copy(df, csv_path):
+    """
+    Guarda una copia Feather junto a una tabla CSV.
+
+    read_table la usa en lugar del CSV mientras no sea más antigua que él,
+    evitando el parseo de texto; el CSV se mantiene para los notebooks.
+
+    Args:
+        df: DataFrame ya guardado en csv_path (sin índice)
+        csv_path: ruta del CSV
+
+    Returns:
+        str o None: ruta de la copia, o None si pyarrow no está instalado
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+    return write_table(df, csv_path, 'feather', index=False)
+
+
+def _fresh_columnar_copy(csv_path):
+    """Ruta de la copia Feather de un CSV si existe y está al día, o None."""
+    if not PARQUET_AVAILABLE:
+        return None
+    feather_path = table_path(csv_path, 'feather')
+    try:
+        if os.stat(feather_path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns:
+            return feather_path
+    except OSError:
+        pass
+    return None
+
+
+def _read_feather(path, index_col=None):
+    """Lee un Feather y, si se pide, usa una columna como índice (como read_csv)."""
+    df = pd.read_feather(path)
+    if index_col is not None:
+        df = df.set_index(df.columns[index_col])
+        if df.index.name == 'index':
+            df.index.name = None
+    return df
+
+
+# Opciones de read_csv que también se respetan al leer Parquet o Feather
+# ('engine' solo elige el parser de CSV y se ignora)
+COLUMNAR_READ_OPTIONS = ('index_col', 'usecols', 'dtype', 'engine')
+
+
+def _apply_csv_options(df, fmt, csv_kwargs):
+    """
+    Aplica a una tabla columnar las opciones de read_csv usecols y dtype.
+
+    Así una misma llamada a read_table devuelve las mismas columnas y tipos
+    sea cual sea el formato encontrado en disco.
+
+    Raises:
+        TypeError: si se pide una opción de read_csv que no se puede aplicar
+        ValueError: si usecols (lista) nombra columnas que no existen
+    """
+    unsupported = sorted(set(csv_kwargs) - set(COLUMNAR_READ_OPTIONS))
+    if unsupported:
+        raise TypeError(
+            f"Opciones de read_csv no soportadas al leer {fmt}: {', '.join(unsupported)}"
+        )
+
+    usecols = csv_kwargs.get('usecols')
+    if usecols is not None:
+        if callable(usecols):
+            df = df[[column for column in df.columns if usecols(column)]]
+        else:
+            missing = set(usecols) - set(df.columns) - {df.index.name}
+            if missing:
+                raise ValueError(f"usecols no coincide con las columnas: {sorted(missing)}")
+            df = df[[column for column in df.columns if column in set(usecols)]]
+
+    dtype = csv_kwargs.get('dtype')
+    if isinstance(dtype, dict):
+        df = df.astype({column: t for column, t in dtype.items() if column in df.columns})
+    elif dtype is not None:
+        df = df.astype(dtype)
+
+    return df
+
+
+def csv_read_options(dtype=None):
+    """
+    Opciones rápidas para pd.read_csv.
+
+    Con pyarrow instalado se usa su lector (multihilo); si no, el motor C
+    con los tipos indicados para evitar la inferencia de tipos.
+
+    Args:
+        dtype: dict columna -> tipo, usado con el motor C
+
+    Returns:
+        dict: argumentos para pd.read_csv / read_table
+    """
+    if PARQUET_AVAILABLE:
+        return {'engine': 'pyarrow'}
+    options = {'engine': 'c'}
+    if dtype is not None:
+        options['dtype'] = dtype
+    return options
+
+
+def read_table(path, fmt='csv', **csv_kwargs):
+    """
+    Lee una tabla guardada con write_table.
+
+    Se intenta primero el formato indicado y, si el archivo no existe,
+    los demás formatos disponibles. Un CSV con copia Feather al día
+    (write_columnar_copy) se lee desde la copia. Al leer Parquet o Feather
+    se aplican usecols y dtype (ver COLUMNAR_READ_OPTIONS); cualquier otra
+    opción de read_csv produce un TypeError en lugar de ignorarse.
+
+    Args:
+        path: ruta del archivo (la extensión se ajusta al formato)
+        fmt: formato preferido, 'csv', 'parquet' o 'feather'
+        **csv_kwargs: argumentos adicionales para pd.read_csv
+
+    Returns:
+        pd.DataFrame
+
+    Raises:
+        FileNotFoundError: si no existe en ningún formato
+        TypeError: si se leen datos columnares con opciones de read_csv no soportadas
+    """
+    preferred = resolve_format(fmt)
+    candidates = [preferred] + [f for f in FORMAT_EXTENSIONS if f != preferred]
+
+    for candidate in candidates:
+        if candidate in COLUMNAR_FORMATS and not PARQUET_AVAILABLE:
+            continue
+        candidate_path = table_path(path, candidate)
+        if os.path.exists(candidate_path):
+            if candidate == 'parquet':
+                # Parquet conserva el índice: index_col no aplica
+                return _apply_csv_options(pd.read_parquet(candidate_path), candidate, csv_kwargs)
+            if candidate == 'feather':
+                df = _read_feather(candidate_path, csv_kwargs.get('index_col'))
+                return _apply_csv_options(df, candidate, csv_kwargs)
+            columnar_copy = _fresh_columnar_copy(candidate_path)
+            if columnar_copy is not None:
+                df = _read_feather(columnar_copy, csv_kwargs.get('index_col'))
+                return _apply_csv_options(df, 'feather', csv_kwargs)
+            return pd.read_csv(candidate_path, **csv_kwargs)
+
+    raise FileNotFoundError(f"Archivo no encontrado: {path}")
+
+
+def table_exists(path):
+    """Indica si existe la tabla en alguno de los formatos soportados."""
+    return any(
+        os.path.exists(table_path(path, candidate))
+        for candidate in FORMAT_EXTENSIONS
+        if candidate not in COLUMNAR_FORMATS or PARQUET_AVAILABLE
+    )
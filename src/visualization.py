@@ -2,61 +2,116 @@
 Módulo para visualización de resultados de simulaciones.
 """
 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import seaborn as sns
 import pandas as pd
 import numpy as np
 import os
-import yaml
 from pathlib import Path
 
+try:
+    from .config_loader import load_config
+    from .storage import read_table, table_exists
+except ImportError:
+    from config_loader import load_config
+    from storage import read_table, table_exists
 
-def load_config(config_path="config/settings.yaml"):
-    """Carga la configuración desde el archivo YAML."""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
 
+# Percentiles de las bandas de evolución del capital
+PERCENTILES = [5, 25, 50, 75, 95]
 
-def load_simulation_results(output_dir="results/simulations/", config_path=None):
+# Columnas y tipos leídos de los archivos de resultados. Declarar los tipos
+# evita la inferencia al parsear el CSV; los gráficos de historiales solo
+# usan estas tres columnas.
+HISTORY_COLUMNS = ['month', 'simulation', 'portfolio_value']
+HISTORY_DTYPES = {
+    'month': 'int32',
+    'simulation': 'int32',
+    'portfolio_value': 'float64'
+}
+# Métricas que usan los gráficos de generate_all_visualizations
+# (distribución, supervivencia y comparación)
+METRICS_COLUMNS = ['survived_full_period', 'final_value', 'months_survived']
+METRICS_DTYPES = {
+    'final_value': 'float64',
+    'total_withdrawals': 'float64',
+    'total_contributions': 'float64',
+    'net_flow': 'float64',
+    'total_rebalance_costs': 'float64',
+    'months_survived': 'int32',
+    'survived_full_period': 'bool',
+    'total_return': 'float64'
+}
+
+
+def _format_usd(x, pos=None):
+    """Formato de las marcas del eje de valores: $1,234,567."""
+    return f'${x:,.0f}'
+
+
+# Rutas relativas ya localizadas, por (ruta, directorio actual)
+_RESOLVED_PATHS = {}
+
+
+def _resolve_path(path):
+    """
+    Localiza una ruta relativa del proyecto, memorizando el resultado.
+    
+    Se prueba, en orden, el directorio actual, el directorio padre (desde
+    notebooks/) y la raíz del proyecto. Solo se memorizan las rutas
+    encontradas: un directorio de resultados puede crearse más tarde
+    (p. ej. al ejecutar la simulación desde el mismo notebook).
+    
+    Args:
+        path: ruta del archivo o directorio
+    
+    Returns:
+        str: la primera ubicación existente, o path si no existe ninguna
+    """
+    path = str(path)
+    if os.path.isabs(path):
+        return path
+    
+    key = (path, os.getcwd())
+    if key not in _RESOLVED_PATHS:
+        candidates = [
+            path,
+            os.path.join("..", path),
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), path)
+        ]
+        found = next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+        if found is None:
+            return path
+        _RESOLVED_PATHS[key] = found
+    return _RESOLVED_PATHS[key]
+
+
+def load_simulation_results(output_dir="results/simulations/", config_path=None,
+                            columns=None):
     """
     Carga resultados de simulaciones.
     
+    Si la simulación dejó una copia columnar al día (write_columnar_copy),
+    se lee esa copia en lugar de parsear el CSV.
+    
     Args:
         output_dir: Directorio donde están los resultados
         config_path: Ruta al archivo de configuración (opcional)
+        columns: columnas de métricas a leer (None: todas), p. ej.
+            METRICS_COLUMNS para los gráficos de este módulo
     """
     if config_path is None:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        
-        if config_path is None:
-            config_path = "config/settings.yaml"  # Default
+        config_path = _resolve_path("config/settings.yaml")
     
     config = load_config(config_path)
     portfolios = config['portfolios']
     scenarios = config['economic_scenarios']
     
     # Normalizar la ruta del directorio de resultados
-    # Si es relativa, intentar encontrar desde diferentes ubicaciones
-    if not os.path.isabs(output_dir):
-        possible_output_dirs = [
-            output_dir,  # Ruta relativa directa
-            os.path.join("..", output_dir),  # Desde notebooks/
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), output_dir)  # Desde raíz del proyecto
-        ]
-        for possible_dir in possible_output_dirs:
-            if os.path.exists(possible_dir):
-                output_dir = possible_dir
-                break
+    output_dir = _resolve_path(output_dir)
     
     results = {}
     
@@ -67,8 +122,13 @@ def load_simulation_results(output_dir="results/simulations/", config_path=None)
             result_key = f"{portfolio_name}_{scenario_name}"
             metrics_path = os.path.join(output_dir, f"metrics_{result_key}.csv")
             
-            if os.path.exists(metrics_path):
-                metrics_df = pd.read_csv(metrics_path)
+            if table_exists(metrics_path):
+                metrics_df = read_table(
+                    metrics_path,
+                    usecols=None if columns is None else (lambda column: column in columns),
+                    dtype=METRICS_DTYPES,
+                    engine='c'
+                )
                 portfolio_results[scenario_name] = metrics_df
         
         if portfolio_results:
@@ -81,6 +141,9 @@ def load_simulation_histories(output_dir="results/simulations/", config_path=Non
     """
     Carga los historiales de simulación guardados.
     
+    Como load_simulation_results, usa la copia columnar si está al día.
+    Solo se leen las columnas de HISTORY_COLUMNS.
+    
     Args:
         output_dir: Directorio donde están los resultados
         config_path: Ruta al archivo de configuración (opcional)
@@ -89,36 +152,14 @@ def load_simulation_histories(output_dir="results/simulations/", config_path=Non
         dict: Diccionario con historiales por cartera y escenario
     """
     if config_path is None:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        
-        if config_path is None:
-            config_path = "config/settings.yaml"  # Default
+        config_path = _resolve_path("config/settings.yaml")
     
     config = load_config(config_path)
     portfolios = config['portfolios']
     scenarios = config['economic_scenarios']
     
     # Normalizar la ruta del directorio de resultados
-    # Si es relativa, intentar encontrar desde diferentes ubicaciones
-    if not os.path.isabs(output_dir):
-        possible_output_dirs = [
-            output_dir,  # Ruta relativa directa
-            os.path.join("..", output_dir),  # Desde notebooks/
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), output_dir)  # Desde raíz del proyecto
-        ]
-        for possible_dir in possible_output_dirs:
-            if os.path.exists(possible_dir):
-                output_dir = possible_dir
-                break
+    output_dir = _resolve_path(output_dir)
     
     histories = {}
     
@@ -129,8 +170,13 @@ def load_simulation_histories(output_dir="results/simulations/", config_path=Non
             result_key = f"{portfolio_name}_{scenario_name}"
             histories_path = os.path.join(output_dir, f"histories_{result_key}.csv")
             
-            if os.path.exists(histories_path):
-                histories_df = pd.read_csv(histories_path)
+            if table_exists(histories_path):
+                histories_df = read_table(
+                    histories_path,
+                    usecols=lambda column: column in HISTORY_COLUMNS,
+                    dtype=HISTORY_DTYPES,
+                    engine='c'
+                )
                 portfolio_histories[scenario_name] = histories_df
         
         if portfolio_histories:
@@ -152,29 +198,36 @@ def plot_portfolio_evolution(histories, title="Evolución de la Cartera",
     """
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    # Mostrar algunos caminos individuales (transparentes)
-    for i, history in enumerate(histories[:n_paths]):
-        ax.plot(history['month'], history['portfolio_value'], 
-                alpha=0.1, color='blue', linewidth=0.5)
-    
-    # Calcular y mostrar percentiles
-    all_months = set()
-    for history in histories:
-        all_months.update(history['month'].values)
-    
-    months_sorted = sorted(all_months)
-    percentiles = {p: [] for p in [5, 25, 50, 75, 95]}
-    
-    for month in months_sorted:
-        values_at_month = []
-        for history in histories:
-            month_data = history[history['month'] == month]
-            if not month_data.empty:
-                values_at_month.append(month_data['portfolio_value'].iloc[0])
-        
-        if values_at_month:
-            for p in percentiles.keys():
-                percentiles[p].append(np.percentile(values_at_month, p))
+    # Mostrar algunos caminos individuales (transparentes), en una sola
+    # colección rasterizada en lugar de una línea por camino
+    segments = [
+        np.column_stack([history['month'], history['portfolio_value']])
+        for history in histories[:n_paths]
+    ]
+    ax.add_collection(LineCollection(segments, colors='blue', alpha=0.1,
+                                     linewidths=0.5, rasterized=True))
+    
+    # Calcular y mostrar percentiles: matriz (meses x simulaciones) con NaN
+    # donde una simulación no llegó a ese mes, y un solo cálculo por fila
+    if histories:
+        months_sorted = np.unique(np.concatenate(
+            [history['month'].to_numpy() for history in histories]
+        ))
+    else:
+        months_sorted = np.array([])
+    values_matrix = np.full((len(months_sorted), len(histories)), np.nan)
+    for j, history in enumerate(histories):
+        rows = np.searchsorted(months_sorted, history['month'].to_numpy())
+        # En orden inverso, para quedarse con el primer valor de cada mes
+        values_matrix[rows[::-1], j] = history['portfolio_value'].to_numpy()[::-1]
+    
+    if values_matrix.size == 0:
+        percentile_values = np.empty((len(PERCENTILES), 0))
+    elif np.isnan(values_matrix).any():
+        percentile_values = np.nanpercentile(values_matrix, PERCENTILES, axis=1)
+    else:
+        percentile_values = np.percentile(values_matrix, PERCENTILES, axis=1)
+    percentiles = dict(zip(PERCENTILES, percentile_values))
     
     # Plotear percentiles
     ax.plot(months_sorted, percentiles[50], 'b-', linewidth=2, label='Mediana (50%)')
@@ -291,6 +344,28 @@ def plot_survival_probability(metrics_df, n_months, title="Probabilidad de Super
     return fig
 
 
+def monthly_percentiles(histories_df, percentiles=PERCENTILES):
+    """
+    Percentiles y media del valor de la cartera por mes, en una sola agrupación.
+    
+    Args:
+        histories_df: DataFrame con columnas 'month' y 'portfolio_value'
+        percentiles: percentiles a calcular (0-100)
+    
+    Returns:
+        np.ndarray: meses ordenados
+        dict: percentil -> np.ndarray con su valor en cada mes
+        np.ndarray: media en cada mes
+    """
+    grouped = histories_df.groupby('month', sort=True)['portfolio_value']
+    quantiles = grouped.quantile([p / 100 for p in percentiles]).unstack()
+    
+    percentiles_data = {
+        p: quantiles[p / 100].to_numpy() for p in percentiles
+    }
+    return quantiles.index.to_numpy(), percentiles_data, grouped.mean().to_numpy()
+
+
 def plot_capital_evolution(histories_df, portfolio_name, scenario_name, 
                            initial_capital=None, title=None, save_path=None):
     """
@@ -312,30 +387,29 @@ def plot_capital_evolution(histories_df, portfolio_name, scenario_name,
     
     # Obtener todas las simulaciones únicas
     simulation_ids = histories_df['simulation'].unique()
-    months = sorted(histories_df['month'].unique())
-    
-    # Calcular percentiles a lo largo del tiempo
-    percentiles_data = {p: [] for p in [5, 25, 50, 75, 95]}
-    mean_values = []
-    
-    for month in months:
-        month_data = histories_df[histories_df['month'] == month]['portfolio_value']
-        if not month_data.empty:
-            values = month_data.values
-            for p in percentiles_data.keys():
-                percentiles_data[p].append(np.percentile(values, p))
-            mean_values.append(values.mean())
-        else:
-            for p in percentiles_data.keys():
-                percentiles_data[p].append(0)
-            mean_values.append(0)
-    
-    # Plotear algunos caminos individuales (transparentes)
-    for sim_id in simulation_ids[:30]:  # Mostrar solo algunas para no saturar
-        sim_data = histories_df[histories_df['simulation'] == sim_id]
-        sim_data_sorted = sim_data.sort_values('month')
-        ax.plot(sim_data_sorted['month'], sim_data_sorted['portfolio_value'], 
-                alpha=0.15, color='gray', linewidth=0.5)
+    
+    # Calcular percentiles y media a lo largo del tiempo
+    months, percentiles_data, mean_values = monthly_percentiles(histories_df, PERCENTILES)
+    
+    # La simulación escribe cada camino ordenado por mes: se comprueba una
+    # vez y solo se ordena cada camino si no es así
+    month_steps = np.diff(histories_df['month'].to_numpy())
+    simulation_changes = np.diff(histories_df['simulation'].to_numpy()) != 0
+    month_ordered = bool(np.all((month_steps > 0) | simulation_changes))
+    
+    # Plotear algunos caminos individuales (transparentes), en una sola
+    # colección rasterizada en lugar de una línea por camino. Solo algunos
+    # para no saturar: un único filtro y un recorrido por grupos, en el
+    # orden de aparición de las simulaciones
+    sample_df = histories_df[histories_df['simulation'].isin(simulation_ids[:30])]
+    segments = []
+    for _, sim_data in sample_df.groupby('simulation', sort=False):
+        if not month_ordered:
+            sim_data = sim_data.sort_values('month')
+        segments.append(np.column_stack([sim_data['month'], 
+                                         sim_data['portfolio_value']]))
+    ax.add_collection(LineCollection(segments, colors='gray', alpha=0.15,
+                                     linewidths=0.5, rasterized=True))
     
     # Plotear percentiles
     ax.plot(months, percentiles_data[50], 'b-', linewidth=2.5, label='Mediana (50%)')
@@ -366,21 +440,7 @@ def plot_capital_evolution(histories_df, portfolio_name, scenario_name,
     if title:
         ax.set_title(title, fontsize=15, fontweight='bold', pad=15)
     else:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        config_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        if config_path is None:
-            config_path = "config/settings.yaml"
-        
-        config = load_config(config_path)
+        config = load_config(_resolve_path("config/settings.yaml"))
         portfolio_label = config['portfolios'][portfolio_name]['name']
         ax.set_title(f'Evolución del Capital - {portfolio_label} ({scenario_name})', 
                      fontsize=15, fontweight='bold', pad=15)
@@ -389,7 +449,7 @@ def plot_capital_evolution(histories_df, portfolio_name, scenario_name,
     ax.grid(True, alpha=0.3, linestyle='--')
     
     # Formatear eje Y con comas
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(_format_usd))
     
     plt.tight_layout()
     
@@ -414,18 +474,7 @@ def plot_capital_evolution_comparison(histories_dict, scenario_name='base',
         config_path: ruta al archivo de configuración (opcional)
     """
     if config_path is None:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        if config_path is None:
-            config_path = "config/settings.yaml"
+        config_path = _resolve_path("config/settings.yaml")
     
     config = load_config(config_path)
     portfolios = config['portfolios']
@@ -450,16 +499,9 @@ def plot_capital_evolution_comparison(histories_dict, scenario_name='base',
         portfolio_label = portfolios[portfolio_name]['name']
         portfolio_names_list.append(portfolio_label)
         
-        # Calcular mediana a lo largo del tiempo
-        months = sorted(histories_df['month'].unique())
-        median_values = []
-        
-        for month in months:
-            month_data = histories_df[histories_df['month'] == month]['portfolio_value']
-            if not month_data.empty:
-                median_values.append(np.percentile(month_data.values, 50))
-            else:
-                median_values.append(0)
+        # Calcular mediana y banda 5-95% a lo largo del tiempo
+        months, percentiles_data, _ = monthly_percentiles(histories_df, [5, 50, 95])
+        median_values = percentiles_data[50]
         
         medians_list.append(median_values)
         
@@ -468,19 +510,8 @@ def plot_capital_evolution_comparison(histories_dict, scenario_name='base',
         ax.plot(months, median_values, linewidth=3, label=portfolio_label, 
                 color=color, alpha=0.8)
         
-        # Calcular y plotear banda de confianza (5-95%)
-        percentile_5 = []
-        percentile_95 = []
-        for month in months:
-            month_data = histories_df[histories_df['month'] == month]['portfolio_value']
-            if not month_data.empty:
-                percentile_5.append(np.percentile(month_data.values, 5))
-                percentile_95.append(np.percentile(month_data.values, 95))
-            else:
-                percentile_5.append(0)
-                percentile_95.append(0)
-        
-        ax.fill_between(months, percentile_5, percentile_95, 
+        # Plotear banda de confianza (5-95%)
+        ax.fill_between(months, percentiles_data[5], percentiles_data[95], 
                          alpha=0.15, color=color)
     
     # Línea de capital inicial
@@ -506,7 +537,7 @@ def plot_capital_evolution_comparison(histories_dict, scenario_name='base',
     ax.grid(True, alpha=0.3, linestyle='--')
     
     # Formatear eje Y con comas
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(_format_usd))
     
     plt.tight_layout()
     
@@ -530,56 +561,39 @@ def plot_portfolio_comparison(results_dict, metric='survival_rate',
         config_path: ruta al archivo de configuración (opcional)
     """
     if config_path is None:
-        # Intentar encontrar el archivo de configuración
-        possible_paths = [
-            "config/settings.yaml",
-            "../config/settings.yaml",
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "config/settings.yaml")
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
-        if config_path is None:
-            config_path = "config/settings.yaml"
+        config_path = _resolve_path("config/settings.yaml")
     
     config = load_config(config_path)
     portfolios = config['portfolios']
     
-    comparison_data = []
-    
-    for portfolio_name, portfolio_results in results_dict.items():
-        portfolio_label = portfolios[portfolio_name]['name']
-        
-        for scenario_name, metrics_df in portfolio_results.items():
-            if metric == 'survival_rate':
-                value = metrics_df['survived_full_period'].mean() * 100
-            elif metric == 'mean_final_value':
-                value = metrics_df['final_value'].mean()
-            else:
-                value = metrics_df[metric].mean()
-            
-            comparison_data.append({
-                'portfolio': portfolio_label,
-                'scenario': scenario_name,
-                'value': value
-            })
-    
-    comparison_df = pd.DataFrame(comparison_data)
+    # Columna de métricas y escala de cada métrica derivada
+    if metric == 'survival_rate':
+        column, scale = 'survived_full_period', 100
+    elif metric == 'mean_final_value':
+        column, scale = 'final_value', 1
+    else:
+        column, scale = metric, 1
+    
+    # Tabla (cartera x escenario) con la media de cada combinación, en el
+    # orden en que aparecen en results_dict
+    values = pd.Series({
+        (portfolios[portfolio_name]['name'], scenario_name): metrics_df[column].mean() * scale
+        for portfolio_name, portfolio_results in results_dict.items()
+        for scenario_name, metrics_df in portfolio_results.items()
+    })
+    portfolios_list = values.index.get_level_values(0).unique()
+    scenarios = values.index.get_level_values(1).unique()
+    comparison_table = values.unstack().reindex(index=portfolios_list, columns=scenarios)
     
     fig, ax = plt.subplots(figsize=(12, 6))
     
     # Crear gráfico de barras agrupadas
-    scenarios = comparison_df['scenario'].unique()
-    portfolios_list = comparison_df['portfolio'].unique()
     x = np.arange(len(portfolios_list))
     width = 0.25
     
     for i, scenario in enumerate(scenarios):
-        scenario_data = comparison_df[comparison_df['scenario'] == scenario]
-        values = [scenario_data[scenario_data['portfolio'] == p]['value'].iloc[0] 
-                  for p in portfolios_list]
-        ax.bar(x + i * width, values, width, label=scenario.capitalize(), alpha=0.8)
+        ax.bar(x + i * width, comparison_table[scenario].to_numpy(), width, 
+               label=scenario.capitalize(), alpha=0.8)
     
     ax.set_xlabel('Cartera', fontsize=11)
     
@@ -605,12 +619,62 @@ def plot_portfolio_comparison(results_dict, metric='survival_rate',
     return fig
 
 
-def generate_all_visualizations(config_path="config/settings.yaml"):
+def _render_figure(task):
+    """
+    Genera y guarda un gráfico, cerrando la figura para liberar su memoria.
+    
+    Args:
+        task: tupla (función de gráfico, args, kwargs)
+    """
+    plot_function, args, kwargs = task
+    fig = plot_function(*args, **kwargs)
+    if fig is not None:
+        plt.close(fig)
+
+
+def _render_figures(tasks, n_workers):
+    """
+    Genera los gráficos de una lista de tareas (función, args, kwargs).
+    
+    Cada figura se cierra tras guardarse, de modo que solo hay una abierta
+    a la vez por proceso.
+    
+    Con más de un proceso los gráficos se reparten en un pool, ya que cada
+    uno es independiente y el renderizado a 300 dpi es intensivo en CPU.
+    
+    Args:
+        tasks: lista de tuplas (función de gráfico, args, kwargs)
+        n_workers: número de procesos (1: secuencial)
+    """
+    if n_workers > 1 and len(tasks) > 1:
+        # Los procesos no necesitan pantalla: backend Agg
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, len(tasks)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=plt.switch_backend,
+            initargs=('Agg',)
+        ) as executor:
+            list(executor.map(_render_figure, tasks))
+    else:
+        for task in tasks:
+            _render_figure(task)
+
+
+def generate_all_visualizations(config_path="config/settings.yaml", n_jobs=None):
     """
     Genera todas las visualizaciones del proyecto.
+    
+    Args:
+        config_path: Ruta al archivo de configuración
+        n_jobs: procesos para los gráficos por cartera y escenario
+            (1: secuencial; -1: todos los núcleos; None: simulation.n_jobs)
     """
     config = load_config(config_path)
     
+    if n_jobs is None:
+        n_jobs = config['simulation'].get('n_jobs', 1)
+    n_workers = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(1, n_jobs)
+    
     print("=" * 60)
     print("📊 GENERACIÓN DE VISUALIZACIONES")
     print("=" * 60)
@@ -637,7 +701,10 @@ def generate_all_visualizations(config_path="config/settings.yaml"):
     
     # Cargar resultados
     print("\n1. Cargando resultados...")
-    results = load_simulation_results(config['project']['output_dir'], config_path=config_path)
+    # Solo las métricas que usan los gráficos de abajo
+    results = load_simulation_results(
+        config['project']['output_dir'], config_path=config_path, columns=METRICS_COLUMNS
+    )
     
     if not results:
         print("❌ No se encontraron resultados. Ejecuta primero: python src/simulation.py")
@@ -655,81 +722,94 @@ def generate_all_visualizations(config_path="config/settings.yaml"):
     print("\n3. Generando gráficos de evolución del capital por cartera...")
     
     # Gráficos de evolución individual por cartera y escenario
+    evolution_tasks = []
     for portfolio_name, portfolio_histories in histories.items():
-        portfolio_label = portfolios[portfolio_name]['name']
-        
         for scenario_name, histories_df in portfolio_histories.items():
-            plot_capital_evolution(
-                histories_df,
-                portfolio_name,
-                scenario_name,
-                initial_capital=initial_capital,
-                save_path=os.path.join(
-                    figures_dir,
-                    f"evolution_{portfolio_name}_{scenario_name}.png"
-                )
-            )
+            evolution_tasks.append((
+                plot_capital_evolution,
+                (histories_df, portfolio_name, scenario_name),
+                {
+                    'initial_capital': initial_capital,
+                    'save_path': os.path.join(
+                        figures_dir,
+                        f"evolution_{portfolio_name}_{scenario_name}.png"
+                    )
+                }
+            ))
+    _render_figures(evolution_tasks, n_workers)
     
     print("\n4. Generando gráficos de comparación de evolución entre carteras...")
     
-    # Comparación de evolución para cada escenario
-    for scenario_name in scenarios.keys():
-        plot_capital_evolution_comparison(
-            histories,
-            scenario_name=scenario_name,
-            initial_capital=initial_capital,
-            save_path=os.path.join(
-                figures_dir,
-                f"evolution_comparison_{scenario_name}.png"
-            ),
-            config_path=config_path
+    # Comparación de evolución para cada escenario (en este proceso: cada
+    # gráfico necesita los historiales de todas las carteras)
+    comparison_tasks = [
+        (
+            plot_capital_evolution_comparison,
+            (histories,),
+            {
+                'scenario_name': scenario_name,
+                'initial_capital': initial_capital,
+                'save_path': os.path.join(
+                    figures_dir,
+                    f"evolution_comparison_{scenario_name}.png"
+                ),
+                'config_path': config_path
+            }
         )
+        for scenario_name in scenarios.keys()
+    ]
+    _render_figures(comparison_tasks, 1)
     
     print("\n5. Generando gráficos de comparación de carteras (métricas)...")
     
-    # Comparación de tasas de supervivencia
-    plot_portfolio_comparison(
-        results, 
-        metric='survival_rate',
-        title="Comparación de Tasas de Supervivencia",
-        save_path=os.path.join(figures_dir, "comparison_survival_rate.png"),
-        config_path=config_path
-    )
-    
-    # Comparación de valores finales
-    plot_portfolio_comparison(
-        results,
-        metric='mean_final_value',
-        title="Comparación de Valores Finales Promedio",
-        save_path=os.path.join(figures_dir, "comparison_final_values.png"),
-        config_path=config_path
-    )
+    _render_figures([
+        # Comparación de tasas de supervivencia
+        (plot_portfolio_comparison, (results,), {
+            'metric': 'survival_rate',
+            'title': "Comparación de Tasas de Supervivencia",
+            'save_path': os.path.join(figures_dir, "comparison_survival_rate.png"),
+            'config_path': config_path
+        }),
+        # Comparación de valores finales
+        (plot_portfolio_comparison, (results,), {
+            'metric': 'mean_final_value',
+            'title': "Comparación de Valores Finales Promedio",
+            'save_path': os.path.join(figures_dir, "comparison_final_values.png"),
+            'config_path': config_path
+        })
+    ], 1)
     
     print("\n6. Generando gráficos de distribución...")
     
     # Distribuciones de valores finales por cartera y escenario
+    distribution_tasks = []
     for portfolio_name, portfolio_results in results.items():
         portfolio_label = portfolios[portfolio_name]['name']
         
         for scenario_name, metrics_df in portfolio_results.items():
-            plot_final_value_distribution(
-                metrics_df,
-                title=f"Distribución - {portfolio_label} ({scenario_name})",
-                save_path=os.path.join(
-                    figures_dir, 
-                    f"distribution_{portfolio_name}_{scenario_name}.png"
-                )
-            )
-            
-            plot_survival_probability(
-                metrics_df,
-                n_months,
-                title=f"Supervivencia - {portfolio_label} ({scenario_name})",
-                save_path=os.path.join(
-                    figures_dir,
-                    f"survival_{portfolio_name}_{scenario_name}.png"
-                )
-            )
+            distribution_tasks.append((
+                plot_final_value_distribution,
+                (metrics_df,),
+                {
+                    'title': f"Distribución - {portfolio_label} ({scenario_name})",
+                    'save_path': os.path.join(
+                        figures_dir, 
+                        f"distribution_{portfolio_name}_{scenario_name}.png"
+                    )
+                }
+            ))
+            distribution_tasks.append((
+                plot_survival_probability,
+                (metrics_df, n_months),
+                {
+                    'title': f"Supervivencia - {portfolio_label} ({scenario_name})",
+                    'save_path': os.path.join(
+                        figures_dir,
+                        f"survival_{portfolio_name}_{scenario_name}.png"
+                    )
+                }
+            ))
+    _render_figures(distribution_tasks, n_workers)
     
     print("\n" + "=" * 60)
     print("✅ VISUALIZACIONES COMPLETADAS")
@@ -738,5 +818,7 @@ def generate_all_visualizations(config_path="config/settings.yaml"):
 
 
 if __name__ == "__main__":
+    # Solo se guardan archivos: backend sin pantalla
+    plt.switch_backend('Agg')
     generate_all_visualizations()
 
@@ -10,7 +10,15 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.data_preprocessing import calculate_returns, calculate_statistics
+from src.data_preprocessing import (
+    calculate_returns, calculate_statistics, Returns,
+    raw_data_path, write_manifest, load_processed_data, download_data,
+    download_tickers_parallel
+)
+import src.data_preprocessing as data_preprocessing
+from src.cache import FileCache, download_cache_key
+from src.storage import PARQUET_AVAILABLE, write_table, write_columnar_copy, read_table
+from src.config_loader import load_config
 
 
 def test_calculate_returns():
@@ -28,6 +36,27 @@ def test_calculate_returns():
     assert not returns['stocks'].isna().any()
 
 
+def test_returns_alignment():
+    """Test del bloque de retornos alineado con calendarios distintos."""
+    dates = pd.date_range('2024-01-01', periods=5)
+    prices_dict = {
+        'stocks': pd.Series([100, 105, 110, 108, 115], index=dates),
+        'gold': pd.Series([50, 52, 51], index=dates[[0, 2, 4]])
+    }
+
+    returns = calculate_returns(prices_dict)
+
+    assert isinstance(returns, Returns)
+    assert returns.values.shape == (4, 2)
+    assert len(returns['gold']) == 2
+    # El retorno del oro se mide respecto a su última cotización válida
+    assert np.isclose(returns['gold'].iloc[0], np.log(52 / 50))
+    pd.testing.assert_frame_equal(
+        calculate_statistics(returns),
+        calculate_statistics(returns.to_dict_of_series())
+    )
+
+
 def test_calculate_statistics():
     """Test de cálculo de estadísticas."""
     # Crear retornos simulados
@@ -61,7 +90,175 @@ def test_statistics_values():
     assert not np.isinf(sharpe)
 
 
-if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
+def test_file_cache_roundtrip(tmp_path):
+    """Test de la caché de descargas en disco."""
+    cache = FileCache(str(tmp_path), ttl_seconds=3600)
+    key = download_cache_key('^GSPC', '2015-01-01', '2025-01-01', '1d')
+    df = pd.DataFrame(
+        {'Close': [100.0, 101.5, 99.8]},
+        index=pd.date_range('2020-01-01', periods=3, tz='America/New_York')
+    )
+
+    assert cache.get(key) is None
+    cache.set(key, df)
+    pd.testing.assert_frame_equal(cache.get(key), df)
+
+    # Una entrada expirada no debe devolverse
+    expired = FileCache(str(tmp_path), ttl_seconds=-1)
+    assert expired.get(key) is None
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'feather'])
+def test_storage_roundtrip(tmp_path, fmt):
+    """Test de escritura y lectura de tablas en CSV/Parquet/Feather."""
+    stats = pd.DataFrame({
+        'asset': ['stocks', 'bonds'],
+        'mean_return_annual': [0.08, 0.03],
+        'std_dev_annual': [0.18, 0.06]
+    })
+
+    path = write_table(stats, str(tmp_path / 'asset_statistics.csv'), fmt, index=False)
+    loaded = read_table(path, fmt)
+
+    pd.testing.assert_frame_equal(loaded, stats)
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="requiere pyarrow")
+def test_columnar_copy(tmp_path):
+    """Test de la copia Feather de un CSV (se usa solo si está al día)."""
+    stats = pd.DataFrame({'asset': ['stocks'], 'sharpe_ratio': [0.5]})
+    csv_path = write_table(stats, str(tmp_path / 'asset_statistics.csv'), 'csv', index=False)
+    feather_path = write_columnar_copy(stats, csv_path)
+
+    pd.testing.assert_frame_equal(read_table(csv_path, 'csv'), stats)
+
+    # Un CSV más reciente que la copia tiene prioridad
+    updated = stats.assign(sharpe_ratio=[0.7])
+    write_table(updated, csv_path, 'csv', index=False)
+    os.utime(feather_path, ns=(0, 0))
+    pd.testing.assert_frame_equal(read_table(csv_path, 'csv'), updated)
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="requiere pyarrow")
+def test_columnar_copy_csv_options(tmp_path):
+    """Test de que usecols y dtype se respeten también al leer la copia Feather."""
+    metrics = pd.DataFrame({'final_value': [1.5, 2.5], 'months_survived': [3, 4], 'extra': [0, 1]})
+    csv_path = write_table(metrics, str(tmp_path / 'metrics.csv'), 'csv', index=False)
+    options = {'usecols': ['final_value', 'months_survived'], 'dtype': {'final_value': 'float32'}}
+    from_csv = read_table(csv_path, 'csv', **options)
+
+    write_columnar_copy(metrics, csv_path)
+    pd.testing.assert_frame_equal(read_table(csv_path, 'csv', **options), from_csv)
+
+    # Las opciones que no se pueden aplicar no se ignoran en silencio
+    with pytest.raises(TypeError):
+        read_table(csv_path, 'csv', parse_dates=['final_value'])
+
 
+def test_load_processed_data_keeps_timezone(tmp_path):
+    """Test de que los precios reutilizados conserven la zona horaria original."""
+    config = {
+        'assets': {'stocks': {'ticker': '^GSPC'}},
+        'data_source': {
+            'start_date': '2020-01-01', 'end_date': '2020-01-10', 'interval': '1d',
+            'download_path': str(tmp_path / 'raw'), 'processed_path': str(tmp_path / 'processed')
+        }
+    }
+    (tmp_path / 'raw').mkdir()
+    (tmp_path / 'processed').mkdir()
+
+    dates = pd.date_range('2020-01-01', periods=3, tz='America/New_York', name='Date')
+    close = pd.Series([100.0, 101.5, 99.8], index=dates, name='Close')
+    write_table(close.to_frame().reset_index(), raw_data_path(tmp_path / 'raw', 'stocks', '^GSPC'),
+                index=False)
+    write_table(calculate_returns({'stocks': close}).to_dataframe(),
+                str(tmp_path / 'processed' / 'returns.csv'))
+    write_table(pd.DataFrame({'asset': ['stocks']}),
+                str(tmp_path / 'processed' / 'asset_statistics.csv'), index=False)
+    write_manifest(config, {'stocks': close})
+
+    prices, _, _ = load_processed_data(config)
+    pd.testing.assert_series_equal(prices['stocks'], close, check_freq=False)
+
+
+def test_download_data_mixed_timezones(tmp_path, monkeypatch):
+    """Test de que un reintento con zona horaria se alinee con el lote sin ella."""
+    dates = pd.date_range('2020-01-01', periods=4)
+    batch = pd.concat(
+        {'^GSPC': pd.DataFrame({'Close': [100.0, 101.0, 102.0, 103.0]}, index=dates)}, axis=1
+    )
+    history = pd.DataFrame(
+        {'Close': [50.0, 51.0, 52.0, 53.0]}, index=dates.tz_localize('America/New_York')
+    )
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            pass
+
+        def history(self, **kwargs):
+            return history
+
+    fake_yf = type('FakeYF', (), {
+        'download': staticmethod(lambda **kwargs: batch),
+        'Ticker': FakeTicker
+    })
+    monkeypatch.setattr(data_preprocessing, 'yf', fake_yf)
+
+    config = {
+        'assets': {
+            'stocks': {'ticker': '^GSPC', 'name': 'S&P 500'},
+            'gold': {'ticker': 'GC=F', 'name': 'Oro'}
+        },
+        'data_source': {
+            'start_date': '2020-01-01', 'end_date': '2020-01-05', 'interval': '1d',
+            'download_path': str(tmp_path / 'raw')
+        }
+    }
+    prices = download_data(config, use_cache=False)
+    returns = calculate_returns(prices)
+
+    assert prices['gold'].index.tz is None
+    assert len(returns['stocks']) == len(returns['gold']) == 3
+
+    # El reintento concurrente devuelve las mismas fechas que el lote
+    retried, errors = download_tickers_parallel(['GC=F', 'CL=F'], config['data_source'])
+    assert not errors
+    for df in retried.values():
+        pd.testing.assert_index_equal(df.index, batch.index)
 
+
+def test_load_config_cache(tmp_path):
+    """Test de la caché de configuración (copias independientes e invalidación)."""
+    config_path = tmp_path / 'settings.yaml'
+    config_path.write_text("project:\n  random_seed: 42\n")
+
+    config = load_config(str(config_path))
+    config['project']['random_seed'] = 0
+    assert load_config(str(config_path))['project']['random_seed'] == 42
+
+    config_path.write_text("project:\n  random_seed: 7\n")
+    os.utime(config_path, (0, os.path.getmtime(config_path) + 10))
+    assert load_config(str(config_path))['project']['random_seed'] == 7
+
+
+def test_log_returns_kernel_compiled():
+    """Test del kernel compilado de retornos frente a la versión de pandas."""
+    pytest.importorskip("numba")
+    from src.data_preprocessing import _log_returns_kernel
+    
+    # El kernel debe estar compilado, no ser la función de Python del shim
+    assert hasattr(_log_returns_kernel, 'py_func')
+    
+    prices = np.array([
+        [100.0, 50.0],
+        [105.0, np.nan],
+        [np.nan, 52.0],
+        [108.0, 51.5]
+    ])
+    expected = np.log(pd.DataFrame(prices)).ffill().diff().where(~np.isnan(prices))
+    
+    np.testing.assert_allclose(_log_returns_kernel(prices), expected.to_numpy(), rtol=1e-12)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
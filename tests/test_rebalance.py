@@ -3,6 +3,7 @@ Tests específicos para estrategias de rebalanceo.
 """
 
 import pytest
+import numpy as np
 import sys
 import os
 from datetime import datetime, timedelta
@@ -47,6 +48,18 @@ def test_threshold_calculation():
     assert should_rebal == True
 
 
+def test_threshold_array_matches_dict():
+    """Test de que la versión vectorial del umbral coincide con la de dict."""
+    target_allocation = {'stocks': 0.6, 'bonds': 0.4}
+    strategy = ThresholdBasedRebalance(target_allocation, threshold=0.05)
+    
+    for current_allocation in ({'stocks': 0.72, 'bonds': 0.28}, {'stocks': 0.62, 'bonds': 0.38}):
+        current_arr = strategy.allocation_array(current_allocation)
+        assert strategy.should_rebalance_array(current_arr) == strategy.should_rebalance(
+            current_allocation, datetime(2025, 1, 1), 100000
+        )
+
+
 def test_create_rebalance_strategy():
     """Test de factory function."""
     portfolio_config = {
@@ -66,6 +79,15 @@ def test_create_rebalance_strategy():
     strategy_threshold = create_rebalance_strategy(portfolio_config_threshold)
     assert isinstance(strategy_threshold, ThresholdBasedRebalance)
 
+    # Claves que la estrategia no usa se ignoran
+    portfolio_config_extra = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.4},
+        'rebalance': {'type': 'threshold', 'threshold': 0.05, 'frequency': 'annual'}
+    }
+    strategy_extra = create_rebalance_strategy(portfolio_config_extra)
+    assert isinstance(strategy_extra, ThresholdBasedRebalance)
+    assert strategy_extra.threshold == 0.05
+
 
 def test_rebalance_values_sum():
     """Test de que los valores rebalanceados sumen correctamente."""
@@ -82,6 +104,71 @@ def test_rebalance_values_sum():
     assert abs(total_after_rebalance - portfolio_value) < 1  # Permitir pequeñas diferencias por redondeo
 
 
+def test_rebalance_vec_matches_dict():
+    """Test de que el rebalanceo vectorial coincida con la interfaz dict."""
+    target_allocation = {'stocks': 0.6, 'bonds': 0.4}
+    strategy = TimeBasedRebalance(target_allocation, transaction_cost=0.002)
+    
+    new_arr, cost_arr = strategy.rebalance_vec(np.array([70000.0, 30000.0]), 100000)
+    new_values, cost = strategy.rebalance({'stocks': 70000, 'bonds': 30000}, 100000)
+    
+    assert cost_arr == pytest.approx(cost) == pytest.approx(100000 * 0.1 * 0.002)
+    assert new_arr.tolist() == [new_values['stocks'], new_values['bonds']]
+
+
+def test_rebalance_cost_legacy_signature():
+    """Test de que la firma original (dicts de asignaciones) siga funcionando."""
+    target_allocation = {'stocks': 0.6, 'bonds': 0.4}
+    strategy = TimeBasedRebalance(target_allocation, transaction_cost=0.002)
+
+    cost = strategy.calculate_rebalance_cost(
+        target_allocation, {'stocks': 0.7, 'bonds': 0.3}, 100000
+    )
+    assert cost == pytest.approx(20.0)
+    assert cost == pytest.approx(
+        strategy.calculate_rebalance_cost(np.array([70000.0, 30000.0]), 100000)
+    )
+
+
+def test_time_based_step_and_reset():
+    """Test del rebalanceo por índice de día y del reinicio entre trayectorias."""
+    strategy = TimeBasedRebalance({'stocks': 0.6, 'bonds': 0.4}, frequency="quarterly")
+    
+    decisions = [strategy.should_rebalance_step(day) for day in range(0, 210, 30)]
+    assert decisions == [True, False, False, True, False, False, True]
+    
+    # Sin reinicio, una nueva trayectoria (día 0) nunca volvería a rebalancear
+    strategy.reset()
+    assert strategy.should_rebalance_step(0)
+
+    # should_rebalance también acepta índices de día enteros
+    strategy.reset()
+    assert [strategy.should_rebalance(None, day, 100000) for day in (0, 30, 90)] == \
+        [True, False, True]
+
+
+def test_step_functions_match_methods():
+    """Test de que las funciones por trayectoria coincidan con los métodos."""
+    target_allocation = {'stocks': 0.6, 'bonds': 0.4}
+    
+    time_strategy = TimeBasedRebalance(target_allocation, frequency="quarterly")
+    should_rebalance, rebalance = time_strategy.step_functions()
+    days = range(0, 210, 30)
+    assert [should_rebalance(None, day) for day in days] == \
+        [time_strategy.should_rebalance_step(day) for day in days]
+    
+    threshold_strategy = ThresholdBasedRebalance(target_allocation, threshold=0.05)
+    should_rebalance, rebalance = threshold_strategy.step_functions()
+    assert should_rebalance(np.array([0.7, 0.3]), 0)
+    assert not should_rebalance(np.array([0.62, 0.38]), 0)
+    
+    values = np.array([70000.0, 30000.0])
+    new_values, cost = rebalance(values, 100000)
+    expected_values, expected_cost = threshold_strategy.rebalance_vec(values, 100000)
+    assert cost == expected_cost
+    assert new_values.tolist() == expected_values.tolist()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
@@ -11,7 +11,10 @@ import os
 # Agregar src al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.simulation import generate_monthly_returns, simulate_portfolio_path
+from src.simulation import (
+    generate_monthly_returns, generate_all_returns, simulate_portfolio_path,
+    monte_carlo_simulation
+)
 from src.rebalance_strategies import TimeBasedRebalance, ThresholdBasedRebalance
 
 
@@ -30,6 +33,238 @@ def test_generate_monthly_returns():
     assert 'bonds' in returns.columns
 
 
+def test_generate_all_returns():
+    """Test de la extracción única de retornos para todas las iteraciones."""
+    asset_stats = {
+        'stocks': {'mean_return': 0.12, 'std_dev': 0.18},
+        'bonds': {'mean_return': 0.04, 'std_dev': 0.06}
+    }
+    
+    returns = generate_all_returns(
+        asset_stats, n_months=24, n_iterations=2000, random_seed=42,
+        assets=['stocks', 'bonds', 'gold']
+    )
+    
+    assert returns.shape == (2000, 24, 3)
+    np.testing.assert_allclose(returns[..., 0].mean(), 0.01, atol=0.001)
+    np.testing.assert_allclose(returns[..., 0].std(), 0.18 / np.sqrt(12), rtol=0.02)
+    # Un activo sin estadísticas no tiene retorno
+    assert not returns[..., 2].any()
+    # Misma semilla, mismos retornos
+    np.testing.assert_array_equal(
+        returns, generate_all_returns(asset_stats, 24, 2000, 42, ['stocks', 'bonds', 'gold'])
+    )
+
+
+@pytest.mark.parametrize("rebalance", [
+    {'type': 'time', 'frequency': 'quarterly'},
+    {'type': 'threshold', 'threshold': 0.05}
+])
+def test_compiled_path_matches_python(monkeypatch, rebalance):
+    """Test de que el bucle compilado coincida con el bucle en Python."""
+    pytest.importorskip("numba")
+    import src.simulation as simulation
+    
+    # Sin Numba el "kernel" sería Python puro y el test no compararía nada
+    assert simulation.NUMBA_AVAILABLE
+    assert hasattr(simulation._simulate_path_kernel, 'py_func')
+    from src.rebalance_strategies import create_rebalance_strategy
+    
+    portfolio_config = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.3, 'cash': 0.1},
+        'rebalance': rebalance
+    }
+    returns = generate_all_returns(
+        {'stocks': {'mean_return': 0.08, 'std_dev': 0.2},
+         'bonds': {'mean_return': 0.03, 'std_dev': 0.07}},
+        n_months=120, n_iterations=1, random_seed=7,
+        assets=list(portfolio_config['allocation'])
+    )[0]
+    
+    def run():
+        return simulation.simulate_portfolio_path(
+            100000, {}, portfolio_config,
+            create_rebalance_strategy(portfolio_config),
+            returns, 900,
+            periodic_contribution=50, contribution_enabled=True,
+            thirteenth_payment_months=[6, 12], thirteenth_payment_amount=900,
+            thirteenth_payment_enabled=True
+        )
+    
+    compiled_history, compiled_metrics = run()
+    monkeypatch.setattr(simulation, 'NUMBA_AVAILABLE', False)
+    python_history, python_metrics = run()
+    
+    pd.testing.assert_frame_equal(compiled_history, python_history, check_dtype=False, rtol=1e-10)
+    assert compiled_metrics == pytest.approx(python_metrics, rel=1e-10)
+
+
+def test_monte_carlo_parallel_matches_serial():
+    """Test de que repartir las iteraciones entre procesos no cambie el resultado."""
+    from src.rebalance_strategies import create_rebalance_strategy
+    
+    asset_stats = {
+        'stocks': {'mean_return': 0.08, 'std_dev': 0.2},
+        'bonds': {'mean_return': 0.03, 'std_dev': 0.07}
+    }
+    portfolio_config = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.4},
+        'rebalance': {'type': 'threshold', 'threshold': 0.05}
+    }
+    
+    results = [
+        monte_carlo_simulation(
+            100000, asset_stats, portfolio_config,
+            create_rebalance_strategy(portfolio_config),
+            n_months=60, n_iterations=6, withdrawal_amount=600,
+            random_seed=3, n_jobs=n_jobs
+        )
+        for n_jobs in (1, 2)
+    ]
+    
+    pd.testing.assert_frame_equal(results[0][1], results[1][1])
+    np.testing.assert_array_equal(results[0][0], results[1][0])
+    
+    # Conservar solo algunos historiales (en el orden pedido)
+    keep = [4, 0, 5]
+    for n_jobs in (1, 2):
+        histories, metrics_df = monte_carlo_simulation(
+            100000, asset_stats, portfolio_config,
+            create_rebalance_strategy(portfolio_config),
+            n_months=60, n_iterations=6, withdrawal_amount=600,
+            random_seed=3, n_jobs=n_jobs, keep_histories=keep
+        )
+        np.testing.assert_array_equal(histories, results[0][0][keep])
+        pd.testing.assert_frame_equal(metrics_df, results[0][1])
+
+
+@pytest.mark.parametrize("rebalance", [
+    {'type': 'time', 'frequency': 'quarterly'},
+    {'type': 'threshold', 'threshold': 0.05}
+])
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_histories_array_matches_paths(monkeypatch, rebalance, vectorized):
+    """Test de que el array de historiales coincida con simulate_portfolio_path."""
+    import src.simulation
+    from src.rebalance_strategies import create_rebalance_strategy
+    from src.simulation import generate_all_returns, histories_to_frame
+    
+    if vectorized:
+        # Sin Numba, monte_carlo_simulation simula el lote completo a la vez
+        monkeypatch.setattr(src.simulation, "NUMBA_AVAILABLE", False)
+    
+    asset_stats = {
+        'stocks': {'mean_return': 0.05, 'std_dev': 0.3},
+        'bonds': {'mean_return': 0.02, 'std_dev': 0.05}
+    }
+    portfolio_config = {
+        'allocation': {'stocks': 0.7, 'bonds': 0.3},
+        'rebalance': rebalance
+    }
+    
+    histories, metrics_df = monte_carlo_simulation(
+        50000, asset_stats, portfolio_config,
+        create_rebalance_strategy(portfolio_config),
+        n_months=120, n_iterations=8, withdrawal_amount=600, random_seed=8
+    )
+    all_returns = generate_all_returns(asset_stats, 120, 8, random_seed=8, assets=['stocks', 'bonds'])
+    
+    assert histories.shape == (8, 120, 10)
+    # Alguna trayectoria agota el capital antes del final
+    assert not metrics_df['survived_full_period'].all()
+    for i in range(8):
+        history, metrics = simulate_portfolio_path(
+            50000, asset_stats, portfolio_config,
+            create_rebalance_strategy(portfolio_config),
+            all_returns[i], 600
+        )
+        assert metrics_df.iloc[i].to_dict() == pytest.approx(metrics)
+        months_survived = metrics_df['months_survived'].iloc[i]
+        assert np.isnan(histories[i, months_survived:]).all()
+        
+        frame = histories_to_frame(histories, portfolio_config['allocation'], [i])
+        assert (frame['simulation'] == i + 1).all()
+        pd.testing.assert_frame_equal(frame.drop(columns='simulation'), history)
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_contribution_into_empty_portfolio(monkeypatch, use_numba):
+    """Test de que una contribución a una cartera vacía se reparta según la asignación."""
+    import src.simulation
+    from src.rebalance_strategies import create_rebalance_strategy
+    
+    if not use_numba:
+        monkeypatch.setattr(src.simulation, "NUMBA_AVAILABLE", False)
+    
+    portfolio_config = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.4},
+        'rebalance': {'type': 'threshold', 'threshold': 0.05}
+    }
+    
+    # Sin capital: cada mes la contribución cubre exactamente el retiro
+    history, metrics = simulate_portfolio_path(
+        0, {}, portfolio_config, create_rebalance_strategy(portfolio_config),
+        np.zeros((12, 2)), 1000, apply_inflation=False,
+        periodic_contribution=1000, contribution_enabled=True
+    )
+    
+    assert metrics['survived_full_period']
+    assert not history.isna().any().any()
+    assert metrics['total_contributions'] == pytest.approx(12000)
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_float32_returns(monkeypatch, use_numba):
+    """Test de que el tensor de retornos en float32 mantenga el estado en float64."""
+    import src.simulation
+    from src.rebalance_strategies import create_rebalance_strategy
+    from src.simulation import generate_all_returns
+    
+    if not use_numba:
+        monkeypatch.setattr(src.simulation, "NUMBA_AVAILABLE", False)
+    
+    asset_stats = {
+        'stocks': {'mean_return': 0.08, 'std_dev': 0.2},
+        'bonds': {'mean_return': 0.03, 'std_dev': 0.07}
+    }
+    portfolio_config = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.4},
+        'rebalance': {'type': 'time', 'frequency': 'annual'}
+    }
+    
+    returns = generate_all_returns(asset_stats, 24, 3, random_seed=1, dtype=np.float32)
+    assert returns.dtype == np.float32
+    
+    histories, metrics_df = monte_carlo_simulation(
+        100000, asset_stats, portfolio_config,
+        create_rebalance_strategy(portfolio_config),
+        n_months=24, n_iterations=3, withdrawal_amount=500,
+        random_seed=1, returns_dtype=np.float32
+    )
+    assert histories.dtype == np.float64
+    assert metrics_df['final_value'].dtype == np.float64
+    assert metrics_df['survived_full_period'].all()
+
+
+def test_withdrawal_schedule():
+    """Test de los retiros por mes precalculados."""
+    from src.simulation import compute_withdrawal_schedule
+    
+    base, extra = compute_withdrawal_schedule(
+        24, 1000, inflation_rate=0.03, apply_inflation=True,
+        thirteenth_payment_months=[12], thirteenth_payment_amount=500,
+        thirteenth_payment_enabled=True
+    )
+    
+    assert base[0] == 1000
+    assert base[12] == pytest.approx(1030)
+    assert extra[11] == pytest.approx(500 * 1.03)
+    assert np.count_nonzero(extra) == 1
+    
+    base, extra = compute_withdrawal_schedule(12, 1000, apply_inflation=False)
+    assert (base == 1000).all() and not extra.any()
+
+
 def test_time_based_rebalance():
     """Test de estrategia de rebalanceo basada en tiempo."""
     target_allocation = {'stocks': 0.6, 'bonds': 0.4}
@@ -87,6 +322,38 @@ def test_rebalance_cost():
     assert abs(new_values['stocks'] / portfolio_value - 0.6) < 0.01
 
 
+def test_float32_returns_statistics():
+    """Test de que las estadísticas con retornos float32 coincidan con float64 dentro del error Monte Carlo."""
+    from src.rebalance_strategies import create_rebalance_strategy
+    
+    asset_stats = {
+        'stocks': {'mean_return': 0.08, 'std_dev': 0.2},
+        'bonds': {'mean_return': 0.03, 'std_dev': 0.07}
+    }
+    portfolio_config = {
+        'allocation': {'stocks': 0.6, 'bonds': 0.4},
+        'rebalance': {'type': 'threshold', 'threshold': 0.05}
+    }
+    
+    results = {}
+    for dtype in (np.float64, np.float32):
+        _, metrics_df = monte_carlo_simulation(
+            100000, asset_stats, portfolio_config,
+            create_rebalance_strategy(portfolio_config),
+            n_months=120, n_iterations=2000, withdrawal_amount=600,
+            random_seed=3, keep_histories=[], returns_dtype=dtype
+        )
+        results[dtype] = metrics_df
+    
+    # float32 usa otra secuencia aleatoria: se comparan las distribuciones
+    full, reduced = results[np.float64], results[np.float32]
+    assert reduced['survived_full_period'].mean() == pytest.approx(
+        full['survived_full_period'].mean(), abs=0.02
+    )
+    assert reduced['final_value'].median() == pytest.approx(full['final_value'].median(), rel=0.05)
+    assert reduced['final_value'].mean() == pytest.approx(full['final_value'].mean(), rel=0.05)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
@@ -0,0 +1,107 @@
+"""
+Tests para los cálculos del módulo de visualización.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+
+from src.visualization import (
+    monthly_percentiles, load_simulation_histories, load_simulation_results,
+    plot_capital_evolution, plot_portfolio_comparison, HISTORY_COLUMNS, METRICS_COLUMNS
+)
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'settings.yaml')
+
+
+def _histories(n_sims=20, n_months=24, seed=0):
+    """Historiales sintéticos; algunas simulaciones terminan antes."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for sim in range(1, n_sims + 1):
+        months_survived = n_months if sim % 3 else n_months // 2
+        frames.append(pd.DataFrame({
+            'month': np.arange(1, months_survived + 1),
+            'portfolio_value': rng.normal(100000, 20000, months_survived),
+            'simulation': sim
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_monthly_percentiles():
+    """Test de que los percentiles por mes coincidan con np.percentile mes a mes."""
+    histories_df = _histories()
+
+    months, percentiles_data, mean_values = monthly_percentiles(histories_df, [5, 50, 95])
+
+    np.testing.assert_array_equal(months, np.arange(1, 25))
+    for i, month in enumerate(months):
+        values = histories_df.loc[histories_df['month'] == month, 'portfolio_value']
+        for p in (5, 50, 95):
+            assert percentiles_data[p][i] == pytest.approx(np.percentile(values, p))
+        assert mean_values[i] == pytest.approx(values.mean())
+
+
+def test_load_simulation_histories_columns(tmp_path):
+    """Test de que los historiales se carguen solo con las columnas usadas y tipos declarados."""
+    histories_df = _histories(n_sims=3, n_months=6)
+    histories_df['withdrawal'] = 1000.0
+    histories_df.to_csv(tmp_path / "histories_cartera_1_base.csv", index=False)
+
+    histories = load_simulation_histories(str(tmp_path), config_path=CONFIG_PATH)
+    loaded = histories['cartera_1']['base']
+
+    assert sorted(loaded.columns) == sorted(HISTORY_COLUMNS)
+    assert loaded['month'].dtype == np.int32
+    np.testing.assert_allclose(loaded['portfolio_value'], histories_df['portfolio_value'])
+
+
+def test_load_simulation_results_columns(tmp_path):
+    """Test de que por defecto se lean todas las métricas y columns las limite."""
+    metrics_df = pd.DataFrame({
+        'final_value': [1.5e5, 0.0],
+        'months_survived': [360, 120],
+        'survived_full_period': [True, False],
+        'total_return': [0.5, -1.0]
+    })
+    metrics_df.to_csv(tmp_path / "metrics_cartera_1_base.csv", index=False)
+
+    results = load_simulation_results(str(tmp_path), config_path=CONFIG_PATH)
+    assert sorted(results['cartera_1']['base'].columns) == sorted(metrics_df.columns)
+    fig = plot_portfolio_comparison(results, metric='total_return', config_path=CONFIG_PATH)
+    plt.close(fig)
+
+    results = load_simulation_results(str(tmp_path), config_path=CONFIG_PATH,
+                                      columns=METRICS_COLUMNS)
+    assert sorted(results['cartera_1']['base'].columns) == sorted(METRICS_COLUMNS)
+
+
+def test_capital_evolution_sample_paths_unordered():
+    """Test de que los caminos de muestra se dibujen ordenados por mes aunque el archivo no lo esté."""
+    histories_df = _histories(n_sims=5, n_months=12)
+    shuffled = histories_df.sample(frac=1, random_state=0)
+
+    paths = []
+    for df in (histories_df, shuffled):
+        fig = plot_capital_evolution(df, 'cartera_1', 'base', initial_capital=100000, title='Test')
+        collection = fig.axes[0].collections[0]
+        paths.append({
+            tuple(path.vertices[:, 1]) for path in collection.get_paths()
+        })
+        plt.close(fig)
+
+    assert paths[0] == paths[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])